@@ -0,0 +1,78 @@
+#!/usr/bin/python3 -tt
+# -*- coding: utf-8 -*-
+#
+# Benchmarks for kitchen.text.converters
+#
+# Run from the kitchen3 directory:
+#   python3 benchmarks/bench_converters.py
+'''
+Time printing many lines through a :func:`kitchen.text.converters.getwriter`
+stream with and without buffering and writing many xml fields with
+:func:`kitchen.text.converters.unicode_to_xml` and
+:func:`kitchen.text.converters.write_xml`.
+'''
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from kitchen.text import converters
+
+LINES = ['line %d: El veloz murciélago saltó sobre el perro perezoso' % num
+        for num in range(200000)]
+
+def print_lines(**kwargs):
+    '''print() every line in LINES to a utf-8 writer and return the bytes'''
+    output = io.BytesIO()
+    stream = converters.getwriter('utf-8')(output, **kwargs)
+    for line in LINES:
+        print(line, file=stream)
+    stream.flush()
+    return output.getvalue()
+
+# Fields like the ones in a package repository's primary.xml
+FIELDS = []
+for num in range(50000):
+    FIELDS.extend(('python3-kitchen-%d' % num, 'noarch',
+        'Kitchen contains a cornucopia of useful code & <snippets>',
+        'https://fedorahosted.org/kitchen'))
+
+def unicode_to_xml_fields():
+    output = io.BytesIO()
+    for field in FIELDS:
+        output.write(converters.unicode_to_xml(field))
+    return output.getvalue()
+
+def write_xml_fields():
+    output = io.BytesIO()
+    converters.write_xml(output, FIELDS)
+    return output.getvalue()
+
+def best(func):
+    '''Return the best time out of three runs of func()'''
+    return min(timeit.repeat(func, number=1, repeat=3))
+
+def main():
+    expected = print_lines()
+    print('print() %d lines' % len(LINES))
+    unbuffered = best(print_lines)
+    print('  %-30s %.4fs' % ('unbuffered', unbuffered))
+    for kwargs in ({'buffer_size': 8192},
+            {'buffer_size': 8192, 'line_buffering': False}):
+        assert print_lines(**kwargs) == expected
+        elapsed = best(lambda: print_lines(**kwargs))
+        print('  %-30s %.4fs  speedup: %.1fx' % (', '.join('%s=%s' % item
+            for item in kwargs.items()), elapsed, unbuffered / elapsed))
+
+    assert write_xml_fields() == unicode_to_xml_fields()
+    print('Escape %d xml fields' % len(FIELDS))
+    one_by_one = best(unicode_to_xml_fields)
+    print('  %-30s %.4fs' % ('unicode_to_xml', one_by_one))
+    elapsed = best(write_xml_fields)
+    print('  %-30s %.4fs  speedup: %.1fx' % ('write_xml', elapsed,
+        one_by_one / elapsed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/python3 -tt
+# -*- coding: utf-8 -*-
+#
+# Benchmarks for kitchen.text.display
+#
+# Run from the kitchen3 directory:
+#   python3 benchmarks/bench_display.py
+'''
+Time the :mod:`kitchen.text.display` functions against the data described in
+the comments of :func:`kitchen.text.display.textual_width`: 1MB of ascii,
+43K of utf8, and a few words.
+'''
+import itertools
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from kitchen.text import display
+
+ASCII_1MB = ('the quick brown fox jumped over the lazy dog\n' * 23832)[:1024 * 1024]
+UTF8_43K = ('速い茶色のキツネが怠惰な犬に\'増 El veloz murciélago saltó sobre el'
+        ' perro perezoso. く ku ら ra と to み mi\n' * 400).encode('utf-8')[:43 * 1024]
+SHORT = 'a few words'
+
+DATA = (
+        ('1MB ascii', ASCII_1MB, 10),
+        ('43K utf8', UTF8_43K, 100),
+        ('short string', SHORT, 100000),
+        )
+
+def per_char_textual_width(msg, control_chars='guess'):
+    '''The previous implementation of textual_width: _ucp_width() on every
+    character'''
+    msg = display.to_unicode(msg)
+    return sum(itertools.starmap(display._ucp_width,
+        zip(map(ord, msg), itertools.repeat(control_chars))))
+
+def best(func, data, number):
+    '''Return the best time out of three runs of calling func(data)'''
+    return min(timeit.repeat(lambda: func(data), number=number, repeat=3))
+
+def compare(title, old, new):
+    '''Print the time taken by old and new on each piece of DATA'''
+    print(title)
+    for name, data, number in DATA:
+        assert old(data) == new(data)
+        old_time = best(old, data, number)
+        new_time = best(new, data, number)
+        print('  %-14s old: %.4fs  new: %.4fs  speedup: %.1fx' % (name,
+            old_time, new_time, old_time / new_time))
+
+def main():
+    compare('textual_width', per_char_textual_width, display.textual_width)
+
+if __name__ == '__main__':
+    main()
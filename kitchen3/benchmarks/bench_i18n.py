@@ -0,0 +1,145 @@
+#!/usr/bin/python3 -tt
+# -*- coding: utf-8 -*-
+#
+# Benchmarks for kitchen.i18n
+#
+# Run from the kitchen3 directory:
+#   python3 benchmarks/bench_i18n.py
+'''
+Time the :mod:`kitchen.i18n` functions with the message catalogs from the
+test suite.
+'''
+import gettext
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import timeit
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from kitchen import i18n
+from kitchen.i18n import bundle
+
+LOCALEDIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data',
+        'locale')
+LANGUAGES = ('de_DE', 'fr_FR', 'pt_BR', 'en_US')
+RUSSIAN_PLURAL = ('n%10==1 && n%100!=11 ? 0 : n%10>=2 && n%10<=4 &&'
+        ' (n%100<10 || n%100>=20) ? 1 : 2')
+
+def write_catalog(filename, count):
+    '''Write a utf-8 message catalog with count messages to filename'''
+    messages = {b'': b'Content-Type: text/plain; charset=UTF-8\n'}
+    for num in range(count):
+        messages[('message number %d' % num).encode('utf-8')] = (
+                'mensagem número %d' % num).encode('utf-8')
+    originals = sorted(messages)
+    offset = 28 + 16 * len(originals)
+    tables = []
+    strings = []
+    for string_list in (originals, [messages[o] for o in originals]):
+        table = []
+        for string in string_list:
+            table.append(struct.pack('<II', len(string), offset))
+            strings.append(string + b'\0')
+            offset += len(string) + 1
+        tables.append(b''.join(table))
+    with open(filename, 'wb') as mofile:
+        mofile.write(struct.pack('<7I', 0x950412de, 0, len(originals), 28,
+            28 + 8 * len(originals), 0, 0))
+        mofile.write(b''.join(tables + strings))
+
+def best(func, number):
+    '''Return the best time per call out of three runs of func()'''
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+def get_translation_object():
+    return i18n.get_translation_object('test', [LOCALEDIR],
+            languages=LANGUAGES, python2_api=False)
+
+def get_shared_translation_object():
+    return i18n.get_translation_object('test', [LOCALEDIR],
+            languages=LANGUAGES, python2_api=False, shared=True)
+
+def main():
+    warnings.simplefilter('ignore', PendingDeprecationWarning)
+    print('get_translation_object  %.1fus' % (best(get_translation_object,
+        10000) * 1000000))
+    print('get_translation_object(shared=True)  %.1fus' % (best(
+        get_shared_translation_object, 10000) * 1000000))
+
+    localedirs = [LOCALEDIR, os.path.join(LOCALEDIR, '..', 'locale-old')]
+    for flatten in (False, True):
+        translations = i18n.get_translation_object('test', localedirs,
+                languages=LANGUAGES, python2_api=False, flatten=flatten)
+        print('gettext of a message in the last catalog, flatten=%s  %.2fus'
+                % (flatten, best(lambda: translations.gettext(
+                    'Only café in fallback'), 100000) * 1000000))
+
+    translations = i18n.get_translation_object('test', localedirs,
+            languages=LANGUAGES, python2_api=False)
+    for message in ('kitchen sink', 'Only café in fallback'):
+        print('lgettext(%r)  %.2fus' % (message, best(lambda:
+            translations.lgettext(message), 100000) * 1000000))
+
+    translations = get_translation_object()
+    print('gettext  %.2fus' % (best(lambda: translations.gettext('kitchen sink'),
+        100000) * 1000000))
+    translations.enable_message_cache()
+    print('gettext with enable_message_cache()  %.2fus' % (best(
+        lambda: translations.gettext('kitchen sink'), 100000) * 1000000))
+
+    print('Plural form of 0-199 and 10000-10199 with the Russian expression')
+    numbers = list(range(200)) + list(range(10000, 10200))
+    for name, plural in (('gettext.c2py', gettext.c2py(RUSSIAN_PLURAL)),
+            ('_plural_function', i18n._plural_function(RUSSIAN_PLURAL))):
+        print('  %-20s %.1fus' % (name, best(lambda: [plural(n)
+            for n in numbers], 1000) * 1000000))
+
+    with tempfile.NamedTemporaryFile(suffix='.mo') as mofile:
+        write_catalog(mofile.name, 100000)
+        print('Load a catalog of 100000 messages and translate 10 of them')
+        for class_ in (i18n.NewGNUTranslations, i18n.LazyGNUTranslations):
+            def load():
+                with open(mofile.name, 'rb') as fp:
+                    translations = class_(fp, python2_api=False)
+                for num in range(0, 100000, 10000):
+                    translations.gettext('message number %d' % num)
+            print('  %-20s %.1fms' % (class_.__name__, best(load, 5) * 1000))
+
+    bench_bundle()
+
+def bench_bundle():
+    '''Compare loading 40 languages from .mo files and from a bundle'''
+    localedir = tempfile.mkdtemp()
+    try:
+        languages = ['l%02d' % num for num in range(40)]
+        for language in languages:
+            os.makedirs(os.path.join(localedir, language, 'LC_MESSAGES'))
+            write_catalog(os.path.join(localedir, language, 'LC_MESSAGES',
+                'big.mo'), 2000)
+        bundle_file = os.path.join(localedir, 'big.bundle')
+        bundle.write_bundle('big', bundle_file, [localedir])
+
+        def load_mofiles():
+            i18n.clear_catalog_cache()
+            for language in languages:
+                i18n.get_translation_object('big', [localedir],
+                        languages=[language], python2_api=False).gettext(
+                                'message number 7')
+        def load_bundle():
+            translation_bundle = bundle.TranslationBundle(bundle_file)
+            for language in languages:
+                translation_bundle.get_translation_object(
+                        languages=[language]).gettext('message number 7')
+
+        print('Set up 40 languages of 2000 messages and translate one message')
+        print('  %-20s %.1fms' % ('.mo files', best(load_mofiles, 5) * 1000))
+        print('  %-20s %.1fms' % ('bundle', best(load_bundle, 5) * 1000))
+    finally:
+        shutil.rmtree(localedir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/python3 -tt
+# -*- coding: utf-8 -*-
+#
+# Benchmarks for importing kitchen
+#
+# Run from the kitchen3 directory:
+#   python3 benchmarks/bench_import.py
+'''
+Time how long a fresh interpreter takes to import kitchen modules.
+
+``import kitchen`` used to set up kitchen's own gettext functions right
+away.  Now that happens the first time one of them is used, so the last
+statement below pays the cost that every import used to pay.
+'''
+import os
+import subprocess
+import sys
+import timeit
+
+KITCHEN_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+STATEMENTS = (
+        'pass',
+        'import kitchen',
+        'import kitchen.text.converters',
+        'import kitchen.text.converters; from kitchen import _',
+        )
+
+def best(statement, number=20):
+    '''Return the best time to run statement in a new interpreter'''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = KITCHEN_DIR
+    command = [sys.executable, '-c', statement]
+    return min(timeit.repeat(lambda: subprocess.check_call(command, env=env),
+        number=1, repeat=number))
+
+def main():
+    baseline = best('pass')
+    for statement in STATEMENTS[1:]:
+        print('%-55s %.1fms' % (statement, (best(statement) - baseline) * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/python3 -tt
+# -*- coding: utf-8 -*-
+#
+# Benchmarks for escaping text for xml in kitchen.text.converters
+#
+# Run from the kitchen3 directory:
+#   python3 benchmarks/bench_xml.py
+'''
+Time :func:`kitchen.text.converters.unicode_to_xml` on strings like the
+fields of package repository metadata.  For comparison, the way that it used
+to escape (:func:`~kitchen.text.misc.process_control_chars` followed by
+:func:`xml.sax.saxutils.escape`) and a single :meth:`str.translate` with one
+table for both the control characters and the entities are timed too.
+
+Then time :func:`kitchen.text.converters.xml_to_unicode` on a document with
+many entities and one without any, against the :func:`re.sub` based
+:func:`~kitchen.text.misc.html_entities_unescape` that it used before.
+
+Last, time checking many byte strings with
+:func:`kitchen.text.misc.invalid_xml_byte_strings` and
+:func:`kitchen.text.misc.invalid_encoding_byte_strings` against the way
+:func:`~kitchen.text.misc.byte_string_valid_xml` and
+:func:`~kitchen.text.misc.byte_string_valid_encoding` used to check one
+and converting them with
+:func:`kitchen.text.converters.guess_encoding_to_xml_many` against the
+recipe in the :func:`~kitchen.text.misc.byte_string_valid_xml` docstring.
+'''
+import html.entities
+import os
+import re
+import sys
+import timeit
+import xml.sax.saxutils
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from kitchen.text import converters, misc
+from kitchen.text.misc import process_control_chars, _CONTROL_CHARS, \
+        _REPLACE_TABLE, _unescape_entity
+
+STRINGS = (
+    ('name', 'python3-kitchen'),
+    ('version', '1.2.6-15.fc38'),
+    ('url', 'https://github.com/fedora-infra/kitchen'),
+    ('summary', 'Useful snippets of python code'),
+    ('summary with entities', 'Tools & <snippets> for "python"'),
+    ('non-ASCII summary', 'Nástroje pro práci s řetězci v Pythonu'),
+    ('description', 'Kitchen contains a cornucopia of useful code.'
+        '  Have you ever found yourself writing the same small functions'
+        ' over and over in every project?  ' * 8),
+    ('description with entities', 'Use <b>kitchen</b> & its friends to'
+        ' handle unicode & i18n in "your" code.  ' * 8),
+    ('changelog with control chars', 'Fix crash on \x1b[0m codes\x00 ' * 8),
+    )
+
+_TRANSLATE_TABLE = dict(_REPLACE_TABLE)
+_TRANSLATE_TABLE.update({ord('&'): '&amp;', ord('<'): '&lt;',
+    ord('>'): '&gt;'})
+
+def old_unicode_to_xml(string):
+    string = process_control_chars(string, strategy='replace')
+    return xml.sax.saxutils.escape(string).encode('utf-8',
+            'xmlcharrefreplace')
+
+def translate_unicode_to_xml(string):
+    return string.translate(_TRANSLATE_TABLE).encode('utf-8',
+            'xmlcharrefreplace')
+
+DOCUMENTS = (
+    ('entities', ('<package><name>python3-kitchen</name><summary>Tools'
+        ' &amp; &lt;snippets&gt; for &quot;python&quot; &#233;t&eacute;'
+        ' &#x263a;</summary></package>\n' * 200).encode('utf-8')),
+    ('no entities', ('Kitchen contains a cornucopia of useful code.  ' * 200
+        ).encode('utf-8')),
+    )
+
+_ENTITY_RE = re.compile(r'(?s)<[^>]*>|&#?\w+;')
+
+def old_fixup(match):
+    string = match.group(0)
+    if string[:1] == '&' and string[:2] != '&#':
+        entity = html.entities.entitydefs.get(string[1:-1])
+        if entity:
+            if entity[:2] == '&#':
+                return chr(int(entity[2:-1]))
+            return entity
+    return _unescape_entity(string)
+
+def old_xml_to_unicode(byte_string):
+    return re.sub(_ENTITY_RE, old_fixup, str(byte_string, 'utf-8', 'replace'))
+
+# Mostly valid ASCII and UTF-8 with one latin-1 string or string with control
+# characters out of every 250
+BYTE_STRINGS = [string.encode('utf-8') for name, string in STRINGS
+        if name != 'changelog with control chars'] * 1000
+for _index in range(0, len(BYTE_STRINGS), 500):
+    BYTE_STRINGS[_index] = STRINGS[5][1].encode('latin-1', 'replace')
+    BYTE_STRINGS[_index + 250] = STRINGS[8][1].encode('utf-8')
+
+def old_byte_string_valid_xml(byte_string, encoding='utf-8'):
+    try:
+        u_string = str(byte_string, encoding)
+    except UnicodeError:
+        return False
+    return not frozenset(u_string).intersection(_CONTROL_CHARS)
+
+def old_byte_string_valid_encoding(byte_string, encoding='utf-8'):
+    try:
+        str(byte_string, encoding)
+    except UnicodeError:
+        return False
+    return True
+
+def recipe_to_xml(byte_strings):
+    processed = []
+    for byte_string in byte_strings:
+        if old_byte_string_valid_xml(byte_string, 'utf-8'):
+            processed.append(byte_string)
+        else:
+            processed.append(converters.guess_encoding_to_xml(byte_string))
+    return processed
+
+def best(func, number=20000):
+    '''Return the best time per call in microseconds out of three runs'''
+    return min(timeit.repeat(func, number=number, repeat=3)) / number \
+            * 1000000
+
+def main():
+    print('%-30s %10s %10s %10s' % ('us per call', 'old', 'translate',
+        'current'))
+    for name, string in STRINGS:
+        expected = converters.unicode_to_xml(string)
+        assert translate_unicode_to_xml(string) == expected
+        print('%-30s %10.2f %10.2f %10.2f' % (name,
+            best(lambda: old_unicode_to_xml(string)),
+            best(lambda: translate_unicode_to_xml(string)),
+            best(lambda: converters.unicode_to_xml(string))))
+
+    print()
+    print('%-30s %10s %10s' % ('xml_to_unicode us per call', 'old',
+        'current'))
+    for name, document in DOCUMENTS:
+        assert old_xml_to_unicode(document) == \
+                converters.xml_to_unicode(document)
+        print('%-30s %10.2f %10.2f' % (name,
+            best(lambda: old_xml_to_unicode(document), 200),
+            best(lambda: converters.xml_to_unicode(document), 200)))
+
+    print()
+    print('Check %d byte strings, ms' % len(BYTE_STRINGS))
+    for name, old_function, function in (
+            ('xml', old_byte_string_valid_xml, misc.invalid_xml_byte_strings),
+            ('encoding', old_byte_string_valid_encoding,
+                misc.invalid_encoding_byte_strings)):
+        old = lambda: [index for index, byte_string
+                in enumerate(BYTE_STRINGS) if not old_function(byte_string)]
+        assert old() == function(BYTE_STRINGS)
+        print('  %-28s %10.2f %10.2f' % (name, best(old, 10) / 1000,
+            best(lambda: function(BYTE_STRINGS), 10) / 1000))
+
+    # The recipe doesn't escape the valid strings so only compare the ones
+    # that don't need escaping
+    valid = [byte_string for byte_string in BYTE_STRINGS
+            if b'&' not in byte_string and b'<' not in byte_string
+            and b'>' not in byte_string]
+    assert recipe_to_xml(valid) == list(
+            converters.guess_encoding_to_xml_many(valid))
+    print('Convert %d byte strings to xml, ms' % len(BYTE_STRINGS))
+    print('  %-28s %10.2f' % ('recipe (no escaping)',
+        best(lambda: recipe_to_xml(BYTE_STRINGS), 10) / 1000))
+    print('  %-28s %10.2f' % ('guess_encoding_to_xml',
+        best(lambda: [converters.guess_encoding_to_xml(byte_string)
+            for byte_string in BYTE_STRINGS], 10) / 1000))
+    print('  %-28s %10.2f' % ('guess_encoding_to_xml_many',
+        best(lambda: list(converters.guess_encoding_to_xml_many(
+            BYTE_STRINGS)), 10) / 1000))
+
+if __name__ == '__main__':
+    main()
@@ -24,16 +24,33 @@ Kitchen
 Aggregate of a bunch of unrelated but helpful python modules.
 '''
 
-# Pylint disabled messages:
-# :C0103: We need gettext aliases for both unicode strings and byte strings.
-#   The byte string one (b_) triggers this warning.
-from kitchen import i18n
+import importlib
+
 from kitchen import versioning
 
-(_, N_) = i18n.easy_gettext_setup('kitchen.core')
-#pylint: disable-msg=C0103
-(b_, bN_) = i18n.easy_gettext_setup('kitchen.core', use_unicode=False)
-#pylint: enable-msg=C0103
+# The gettext functions for kitchen's own messages are set up the first time
+# that they are used.  Setting them up means importing kitchen.i18n and
+# searching the locale directories for message catalogs which is more than
+# a program that only uses kitchen.text should have to pay for at startup.
+_GETTEXT_FUNCTIONS = frozenset(('_', 'N_', 'b_', 'bN_'))
+
+def __getattr__(name):
+    # Pylint disabled messages:
+    # :C0103: We need gettext aliases for both unicode strings and byte
+    #   strings.  The byte string one (b_) triggers this warning.
+    #pylint: disable-msg=C0103
+    if name == 'i18n':
+        return importlib.import_module('kitchen.i18n')
+    if name not in _GETTEXT_FUNCTIONS:
+        raise AttributeError('module %r has no attribute %r'
+                % (__name__, name))
+
+    i18n = importlib.import_module('kitchen.i18n')
+    (_, N_) = i18n.easy_gettext_setup('kitchen.core')
+    (b_, bN_) = i18n.easy_gettext_setup('kitchen.core', use_unicode=False)
+    # Save them so that this function isn't called for them again
+    globals().update(_=_, N_=N_, b_=b_, bN_=bN_)
+    return globals()[name]
 
 __version_info__ = ((1, 2, 6),)
 __version__ = versioning.version_tuple_to_string(__version_info__)
@@ -89,16 +89,22 @@ See the documentation of :func:`easy_gettext_setup` and
 
 from kitchen.versioning import version_tuple_to_string
 
-__version_info__ = ((2, 2, 0),)
+__version_info__ = ((2, 3, 0),)
 __version__ = version_tuple_to_string(__version_info__)
 
+from collections.abc import Mapping
+import codecs
 import copy
+import gc
 from errno import ENOENT
 import gettext
 import itertools
 import locale
+import mmap
 import os
+import struct
 import sys
+import threading
 import warnings
 
 # We use the _default_localedir definition in get_translation_object
@@ -112,9 +118,85 @@ from kitchen.text.misc import byte_string_valid_encoding, isbasestring
 
 # We cache parts of the translation objects just like stdlib's gettext so that
 # we don't reparse the message files and keep them in memory separately if the
-# same catalog is opened twice.
+# same catalog is opened twice.  Keys are (full path, translation class) since
+# the classes read the file differently.
 _translations = {}
 
+# Looking up a message catalog in _translations doesn't take a lock.  When it
+# isn't there, the thread that reads it holds a lock from _loading_locks for
+# that file and class so that other threads wait for it instead of reading the
+# same file.  _loading_locks itself is protected by _loading_locks_lock.
+_loading_locks = {}
+_loading_locks_lock = threading.Lock()
+
+# Translation objects that get_translation_object(shared=True) returned, keyed
+# by the message catalog files and the parameters that they were set up with
+_shared_translations = {}
+
+# Searching the localedirs for message catalogs means stat'ing a file for
+# every combination of language and localedir.  We remember where the message
+# catalogs were found so that later calls for the same domain and languages
+# don't touch the filesystem.  clear_catalog_cache() forgets these.
+_catalog_paths = {}
+
+# Catalogs that get_translation_object(flatten=True) merged together, keyed
+# by the tuple of the message catalog files that went into them
+_flattened_catalogs = {}
+
+# Plural form indexes for n in range(_PLURAL_TABLE_SIZE) are computed once for
+# each plural expression so that ngettext() can look them up
+_PLURAL_TABLE_SIZE = 1001
+
+# Plural functions made by _plural_function(), keyed by the plural expression
+_plural_functions = {}
+
+# Python versions of the plural expressions from the gettext manual.  These
+# are used for ints that are too big for the table instead of the functions
+# from gettext.c2py() which check their argument's type before evaluating it.
+# The keys are the expressions with whitespace removed.
+_COMMON_PLURALS = {
+        # Japanese, Chinese, Korean, Turkish, and others
+        '0': lambda n: 0,
+        # English, German, Spanish, and many others
+        'n!=1': lambda n: int(n != 1),
+        # French, Brazilian Portuguese
+        'n>1': lambda n: int(n > 1),
+        # Latvian
+        'n%10==1&&n%100!=11?0:n!=0?1:2': lambda n:
+            0 if n % 10 == 1 and n % 100 != 11 else 1 if n != 0 else 2,
+        # Irish
+        'n==1?0:n==2?1:2': lambda n: 0 if n == 1 else 1 if n == 2 else 2,
+        # Romanian
+        'n==1?0:(n==0||(n%100>0&&n%100<20))?1:2': lambda n:
+            0 if n == 1 else 1 if n == 0 or 0 < n % 100 < 20 else 2,
+        # Lithuanian
+        'n%10==1&&n%100!=11?0:n%10>=2&&(n%100<10||n%100>=20)?1:2': lambda n:
+            0 if n % 10 == 1 and n % 100 != 11
+            else 1 if n % 10 >= 2 and not 10 <= n % 100 < 20 else 2,
+        # Russian, Ukrainian, Serbian, Croatian
+        'n%10==1&&n%100!=11?0:n%10>=2&&n%10<=4&&(n%100<10||n%100>=20)?1:2':
+            lambda n: 0 if n % 10 == 1 and n % 100 != 11
+            else 1 if 2 <= n % 10 <= 4 and not 10 <= n % 100 < 20 else 2,
+        # Czech, Slovak
+        '(n==1)?0:(n>=2&&n<=4)?1:2': lambda n:
+            0 if n == 1 else 1 if 2 <= n <= 4 else 2,
+        # Polish
+        'n==1?0:n%10>=2&&n%10<=4&&(n%100<10||n%100>=20)?1:2': lambda n:
+            0 if n == 1
+            else 1 if 2 <= n % 10 <= 4 and not 10 <= n % 100 < 20 else 2,
+        # Slovenian
+        'n%100==1?0:n%100==2?1:n%100==3||n%100==4?2:3': lambda n:
+            0 if n % 100 == 1 else 1 if n % 100 == 2
+            else 2 if n % 100 in (3, 4) else 3,
+        }
+
+# Names that codecs gives charsets, keyed by the names that they were given to
+# us with.  Used to tell whether two charset names are the same charset.
+_charset_names = {}
+
+# Environment variables that gettext.find() takes the user's languages from
+_LANGUAGE_ENVVARS = ('LANGUAGE', 'LC_ALL', 'LC_MESSAGES', 'LANG')
+
 class DummyTranslations(gettext.NullTranslations):
     '''Safer version of :class:`gettext.NullTranslations`
 
@@ -203,6 +285,8 @@ class DummyTranslations(gettext.NullTranslations):
 
     .. versionchanged:: kitchen-1.2.0 ; API kitchen.i18n 2.2.0
         Add python2_api parameter to __init__()
+    .. versionchanged:: kitchen-1.2.7 ; API kitchen.i18n 2.3.0
+        Add :meth:`enable_message_cache` and :meth:`disable_message_cache`
     '''
     #pylint: disable-msg=C0103,C0111
     def __init__(self, fp=None, python2_api=True):
@@ -216,6 +300,10 @@ class DummyTranslations(gettext.NullTranslations):
         # 'utf-8' is only a default here.  Users can override.
         self._input_charset = 'utf-8'
 
+        # Translations are only cached after enable_message_cache() is called
+        self._message_cache_size = 0
+        self._message_caches = []
+
         # Decide whether to mimic the python2 or python3 api
         self.python2_api = python2_api
 
@@ -227,6 +315,10 @@ class DummyTranslations(gettext.NullTranslations):
                     ' switching to the python3 api by setting'
                     ' python2_api=False when creating the gettext object',
                     PendingDeprecationWarning, stacklevel=2)
+        self._bind_methods()
+
+    def _bind_methods(self):
+        if self._python2_api:
             self.gettext = self._gettext
             self.lgettext = self._lgettext
             self.ugettext = self._ugettext
@@ -241,6 +333,97 @@ class DummyTranslations(gettext.NullTranslations):
             self.ugettext = self._removed_method_factory('ugettext')
             self.ungettext = self._removed_method_factory('ungettext')
 
+        self._message_caches = []
+        if self._message_cache_size:
+            for name in ('gettext', 'ngettext'):
+                setattr(self, name, self._cached_method_factory(
+                    getattr(self, name)))
+            for name in ('lgettext', 'lngettext'):
+                setattr(self, name, self._cached_method_factory(
+                    getattr(self, name), uses_locale=True))
+            if self._python2_api:
+                for name in ('ugettext', 'ungettext'):
+                    setattr(self, name, self._cached_method_factory(
+                        getattr(self, name)))
+
+    def _cached_method_factory(self, method, uses_locale=False):
+        cache = {}
+        self._message_caches.append(cache)
+        size = self._message_cache_size
+        def _cached_method(*args):
+            if uses_locale:
+                # The output encoding may change with the locale
+                key = (args, self._output_charset
+                        or locale.getpreferredencoding())
+            else:
+                key = args
+            try:
+                return cache[key]
+            except KeyError:
+                pass
+            except TypeError:
+                # Unhashable messages aren't cached
+                return method(*args)
+            message = method(*args)
+            if len(cache) >= size:
+                cache.clear()
+            cache[key] = message
+            return message
+        return _cached_method
+
+    def _clear_message_cache(self):
+        for cache in self._message_caches:
+            cache.clear()
+
+    def enable_message_cache(self, maxsize=1024):
+        '''Remember the results of translating messages
+
+        :kwarg maxsize: Number of messages to remember for each of the gettext
+            methods.  When the limit is reached, the remembered messages are
+            forgotten and the cache starts over.
+
+        Programs that translate the same messages over and over can use this
+        so that looking up a message that was translated before is a single
+        dictionary lookup.  The cache is emptied when
+        :meth:`set_output_charset` or :meth:`add_fallback` are called or
+        :attr:`input_charset` is set on this object.  Changing the
+        fallbacks in other ways (for instance, calling
+        :meth:`set_output_charset` directly on a fallback) is not noticed so
+        call :meth:`enable_message_cache` again to start with an empty cache
+        after doing that.
+
+        .. note::
+
+            The gettext methods are replaced when this is called.  Look them
+            up again afterwards instead of using ones that were saved before
+            calling this.
+
+        .. versionadded:: kitchen-1.2.7 ; API kitchen.i18n 2.3.0
+        '''
+        self._message_cache_size = maxsize
+        self._bind_methods()
+
+    def disable_message_cache(self):
+        '''Stop remembering the results of translating messages
+
+        .. versionadded:: kitchen-1.2.7 ; API kitchen.i18n 2.3.0
+        '''
+        self._message_cache_size = 0
+        self._bind_methods()
+
+    def add_fallback(self, fallback):
+        gettext.NullTranslations.add_fallback(self, fallback)
+        self._clear_message_cache()
+
+    def __copy__(self):
+        # Faster than copy.copy()'s generic __reduce_ex__ path.  The gettext
+        # methods stored on the instance are bound to self so they have to be
+        # bound again for the copy.
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new._bind_methods()
+        return new
+
     def _removed_method_factory(self, name):
         def _removed_method(*args, **kwargs):
             raise AttributeError("'%s' object has no attribute '%s'" %
@@ -263,6 +446,7 @@ class DummyTranslations(gettext.NullTranslations):
             except AttributeError:
                 pass
         self._input_charset = charset
+        self._clear_message_cache()
 
     def _get_input_charset(self):
         return self._input_charset
@@ -286,56 +470,71 @@ class DummyTranslations(gettext.NullTranslations):
             gettext.NullTranslations.set_output_charset(self, charset)
         except AttributeError:
             self._output_charset = charset
+        self._clear_message_cache()
 
     if not hasattr(gettext.NullTranslations, 'output_charset'):
         def output_charset(self):
             '''Compatibility for python2.3 which doesn't have output_charset'''
             return self._output_charset
 
-    def _reencode_if_necessary(self, message, output_encoding):
+    def _gettext_encoding(self):
+        '''Return the charset that gettext and ngettext return bytes in'''
+        return self._output_charset or self._charset or self.input_charset
+
+    def _lgettext_encoding(self):
+        '''Return the charset that lgettext and lngettext return bytes in'''
+        return self._output_charset or locale.getpreferredencoding()
+
+    def _reencode_if_necessary(self, message, output_encoding,
+            message_encoding=None):
         '''Return a byte string that's valid in a specific charset.
 
+        :arg message: The message to return in :attr:`output_encoding`
+        :arg output_encoding: The charset to return the message in
+        :kwarg message_encoding: If :attr:`message` is a byte :class:`bytes`
+            that is known to be encoded in a charset (because it came from
+            a translation object that returns that charset), the charset.
+            When it is the same charset as :attr:`output_encoding`, the
+            message is returned without checking that it's valid.
+
         .. warning:: This method may mangle the message if the inpput encoding
             is not known or the message isn't represntable in the chosen
             output encoding.
         '''
-        valid = False
-        msg = None
-        try:
-            valid = byte_string_valid_encoding(message, output_encoding)
-        except TypeError:
-            # input was unicode, so it needs to be encoded
-            pass
-
-        if valid:
-            return message
-        try:
-            # Decode to unicode so we can re-encode to desired encoding
-            msg = to_unicode(message, encoding=self.input_charset,
-                    nonstring='strict')
-        except TypeError:
+        if isinstance(message, str):
+            return message.encode(output_encoding, 'replace')
+        if not isinstance(message, (bytes, bytearray)):
             # Not a string; return an empty byte string
             return b''
 
-        # Make sure that we're returning a str of the desired encoding
-        return to_bytes(msg, encoding=output_encoding)
+        if message_encoding and (message_encoding == output_encoding
+                or _charset_name(message_encoding)
+                    == _charset_name(output_encoding)):
+            return message
+        if byte_string_valid_encoding(message, output_encoding):
+            return message
+
+        # Decode to unicode so we can re-encode to desired encoding
+        msg = to_unicode(message, encoding=self.input_charset)
+        return msg.encode(output_encoding, 'replace')
 
     def _gettext(self, message):
+        message_encoding = None
         # First use any fallback gettext objects.  Since DummyTranslations
         # doesn't do any translation on its own, this is a good first step.
         if self._fallback:
             try:
                 message = self._fallback.gettext(message)
+                message_encoding = self._fallback._gettext_encoding()
             except (AttributeError, UnicodeError):
                 # Ignore UnicodeErrors: We'll do our own encoding next
                 pass
 
-        # Next decide what encoding to use for the strings we return
-        output_encoding = (self._output_charset or self._charset or
-                self.input_charset)
-        return self._reencode_if_necessary(message, output_encoding)
+        return self._reencode_if_necessary(message, self._gettext_encoding(),
+                message_encoding)
 
     def _ngettext(self, msgid1, msgid2, n):
+        message_encoding = None
         # Default
         if n == 1:
             message = msgid1
@@ -346,33 +545,31 @@ class DummyTranslations(gettext.NullTranslations):
         if self._fallback:
             try:
                 message = self._fallback.ngettext(msgid1, msgid2, n)
+                message_encoding = self._fallback._gettext_encoding()
             except (AttributeError, UnicodeError):
                 # Ignore UnicodeErrors: We'll do our own encoding next
                 pass
 
-        # Next decide what encoding to use for the strings we return
-        output_encoding = (self._output_charset or self._charset or
-                self.input_charset)
-
-        return self._reencode_if_necessary(message, output_encoding)
+        return self._reencode_if_necessary(message, self._gettext_encoding(),
+                message_encoding)
 
     def _lgettext(self, message):
+        message_encoding = None
         if self._fallback:
             try:
                 message = self._fallback.lgettext(message)
+                message_encoding = self._fallback._lgettext_encoding()
             except (AttributeError, UnicodeError):
                 # Ignore UnicodeErrors: we'll do our own encoding next
                 # AttributeErrors happen on py2.3 where lgettext is not
                 # implemented
                 pass
 
-        # Next decide what encoding to use for the strings we return
-        output_encoding = (self._output_charset or
-                locale.getpreferredencoding())
-
-        return self._reencode_if_necessary(message, output_encoding)
+        return self._reencode_if_necessary(message, self._lgettext_encoding(),
+                message_encoding)
 
     def _lngettext(self, msgid1, msgid2, n):
+        message_encoding = None
         # Default
         if n == 1:
             message = msgid1
@@ -382,17 +579,15 @@ class DummyTranslations(gettext.NullTranslations):
         if self._fallback:
             try:
                 message = self._fallback.lngettext(msgid1, msgid2, n)
+                message_encoding = self._fallback._lgettext_encoding()
             except (AttributeError, UnicodeError):
                 # Ignore UnicodeErrors: we'll do our own encoding next
                 # AttributeError happens on py2.3 where lngettext is not
                 # implemented
                 pass
 
-        # Next decide what encoding to use for the strings we return
-        output_encoding = (self._output_charset or
-                locale.getpreferredencoding())
-
-        return self._reencode_if_necessary(message, output_encoding)
+        return self._reencode_if_necessary(message, self._lgettext_encoding(),
+                message_encoding)
 
     def _ugettext(self, message):
         if not isbasestring(message):
@@ -516,8 +711,14 @@ class NewGNUTranslations(DummyTranslations, gettext.GNUTranslations):
     #pylint: disable-msg=C0103,C0111
     def _parse(self, fp):
         gettext.GNUTranslations._parse(self, fp)
+        plural_forms = self._info.get('plural-forms')
+        if plural_forms:
+            # Same as gettext.GNUTranslations._parse()
+            self.plural = _plural_function(
+                    plural_forms.split(';')[1].split('plural=')[1])
 
     def _gettext(self, message):
+        message_encoding = None
         if not isbasestring(message):
             return b''
         tmsg = message
@@ -528,17 +729,16 @@ class NewGNUTranslations(DummyTranslations, gettext.GNUTranslations):
             if self._fallback:
                 try:
                     tmsg = self._fallback.gettext(message)
+                    message_encoding = self._fallback._gettext_encoding()
                 except (AttributeError, UnicodeError):
                     # Ignore UnicodeErrors: We'll do our own encoding next
                     pass
 
-        # Next decide what encoding to use for the strings we return
-        output_encoding = (self._output_charset or self._charset or
-                self.input_charset)
-
-        return self._reencode_if_necessary(tmsg, output_encoding)
+        return self._reencode_if_necessary(tmsg, self._gettext_encoding(),
+                message_encoding)
 
     def _ngettext(self, msgid1, msgid2, n):
+        message_encoding = None
         if n == 1:
             tmsg = msgid1
         else:
@@ -554,17 +754,16 @@ class NewGNUTranslations(DummyTranslations, gettext.GNUTranslations):
             if self._fallback:
                 try:
                     tmsg = self._fallback.ngettext(msgid1, msgid2, n)
+                    message_encoding = self._fallback._gettext_encoding()
                 except (AttributeError, UnicodeError):
                     # Ignore UnicodeErrors: We'll do our own encoding next
                     pass
 
-        # Next decide what encoding to use for the strings we return
-        output_encoding = (self._output_charset or self._charset or
-                self.input_charset)
-
-        return self._reencode_if_necessary(tmsg, output_encoding)
+        return self._reencode_if_necessary(tmsg, self._gettext_encoding(),
+                message_encoding)
 
     def _lgettext(self, message):
+        message_encoding = None
         if not isbasestring(message):
             return b''
         tmsg = message
@@ -575,17 +774,16 @@ class NewGNUTranslations(DummyTranslations, gettext.GNUTranslations):
             if self._fallback:
                 try:
                     tmsg = self._fallback.lgettext(message)
+                    message_encoding = self._fallback._lgettext_encoding()
                 except (AttributeError, UnicodeError):
                     # Ignore UnicodeErrors: We'll do our own encoding next
                     pass
 
-        # Next decide what encoding to use for the strings we return
-        output_encoding = (self._output_charset or
-                locale.getpreferredencoding())
-
-        return self._reencode_if_necessary(tmsg, output_encoding)
+        return self._reencode_if_necessary(tmsg, self._lgettext_encoding(),
+                message_encoding)
 
     def _lngettext(self, msgid1, msgid2, n):
+        message_encoding = None
         if n == 1:
             tmsg = msgid1
         else:
@@ -601,15 +799,13 @@ class NewGNUTranslations(DummyTranslations, gettext.GNUTranslations):
             if self._fallback:
                 try:
                     tmsg = self._fallback.lngettext(msgid1, msgid2, n)
+                    message_encoding = self._fallback._lgettext_encoding()
                 except (AttributeError, UnicodeError):
                     # Ignore UnicodeErrors: We'll do our own encoding next
                     pass
 
-        # Next decide what encoding to use for the strings we return
-        output_encoding = (self._output_charset or
-                locale.getpreferredencoding())
-
-        return self._reencode_if_necessary(tmsg, output_encoding)
+        return self._reencode_if_necessary(tmsg, self._lgettext_encoding(),
+                message_encoding)
 
 
     def _ugettext(self, message):
@@ -655,7 +851,8 @@ class NewGNUTranslations(DummyTranslations, gettext.GNUTranslations):
 
 
 def get_translation_object(domain, localedirs=tuple(), languages=None,
-        class_=None, fallback=True, codeset=None, python2_api=True):
+        class_=None, fallback=True, codeset=None, python2_api=True,
+        flatten=False, shared=False):
     '''Get a translation object bound to the :term:`message catalogs`
 
     :arg domain: Name of the message domain.  This should be a unique name
@@ -686,6 +883,8 @@ def get_translation_object(domain, localedirs=tuple(), languages=None,
 
     :kwarg class_:  The class to use to extract translations from the
         :term:`message catalogs`.  Defaults to :class:`NewGNUTranslations`.
+        :class:`LazyGNUTranslations` loads large catalogs faster and uses
+        less memory.
     :kwarg fallback: If set to data:`False`, raise an :exc:`IOError` if no
         :term:`message catalogs` are found.  If :data:`True`, the default,
         return a :class:`DummyTranslations` object.
@@ -702,6 +901,26 @@ def get_translation_object(domain, localedirs=tuple(), languages=None,
         Translation objects that use the python3 gettext api (gettext returns
         :class:`str` strings and lgettext returns byte :class:`bytes`.
         ugettext does not exist.)
+    :kwarg flatten: When :data:`True`, merge the :term:`message catalogs`
+        that are found into a single table so that a msgid that is not in
+        the first catalog is looked up once instead of once per catalog.
+        Messages from catalogs found earlier take priority, just as they do
+        when the catalogs are searched one after the other.  Only catalogs
+        that share the first catalog's charset and plural forms can be
+        merged; from the first catalog that doesn't, the rest are searched
+        as fallbacks as usual.  Catalogs that aren't loaded into
+        a :class:`dict` (for instance, by :class:`LazyGNUTranslations`) are
+        not merged either.  Default is :data:`False`.
+    :kwarg shared: When :data:`True`, return the same translation object
+        every time this is called with the same parameters and the same
+        :term:`message catalogs` are found.  The object is set up the first
+        time and later calls just look it up so this is fast enough to call
+        for every request in a server.  The object is shared so don't
+        change it (for instance, by calling
+        :meth:`~DummyTranslations.add_fallback`,
+        :meth:`~DummyTranslations.set_output_charset`, or
+        :meth:`~DummyTranslations.enable_message_cache` on it).  Default is
+        :data:`False` which returns a new object that can be changed.
     :return: Translation object to get :mod:`gettext` methods from
 
     If you need more flexibility than :func:`easy_gettext_setup`, use this
@@ -784,6 +1003,15 @@ def get_translation_object(domain, localedirs=tuple(), languages=None,
         :func:`gettext.translation` function.
     .. versionchanged:: kitchen-1.2.0 ; API kitchen.i18n 2.2.0
         Add python2_api parameter
+    .. versionchanged:: kitchen-1.2.7 ; API kitchen.i18n 2.3.0
+        Remember where the :term:`message catalogs` were found so that
+        calling this again with the same domain, :attr:`localedirs`, and
+        :attr:`languages` doesn't search the filesystem.  Use
+        :func:`clear_catalog_cache` when catalogs are installed or removed
+        while the program is running.
+        Add the flatten and shared parameters.
+        Safe to call from several threads at once; a :term:`message catalog`
+        that several threads need at the same time is only read once.
     '''
     if python2_api:
         warnings.warn('get_translation_object returns gettext objects'
@@ -795,47 +1023,499 @@ def get_translation_object(domain, localedirs=tuple(), languages=None,
     if not class_:
         class_ = NewGNUTranslations
 
-    mofiles = []
-    for localedir in itertools.chain(localedirs, (_DEFAULT_LOCALEDIR,)):
-        mofiles.extend(gettext.find(domain, localedir, languages, all=1))
+    mofiles = _find_catalogs(domain, localedirs, languages)
     if not mofiles:
         if fallback:
             return DummyTranslations(python2_api=python2_api)
         raise IOError(ENOENT, 'No translation file found for domain', domain)
 
-    # Accumulate a translation with fallbacks to all the other mofiles
-    stacked_translations = None
-    for mofile in mofiles:
-        full_path = os.path.abspath(mofile)
-        translation = _translations.get(full_path)
-        if not translation:
-            mofile_fh = open(full_path, 'rb')
-            try:
-                try:
-                    translation = _translations.setdefault(full_path,
-                            class_(mofile_fh, python2_api=python2_api))
-                except TypeError:
-                    # Only our translation classes have the python2_api
-                    # parameter
-                    translation = _translations.setdefault(full_path,
-                            class_(mofile_fh))
+    if shared:
+        key = (mofiles, class_, codeset, bool(python2_api), bool(flatten))
+        try:
+            return _shared_translations[key]
+        except KeyError:
+            pass
 
-            finally:
-                mofile_fh.close()
+    translations = []
+    for full_path in mofiles:
+        translation = _translations.get((full_path, class_))
+        if not translation:
+            translation = _load_translation(full_path, class_, python2_api)
 
         # Shallow copy the object so that the fallbacks and output charset can
         # differ but the data we read from the mofile is shared.
         translation = copy.copy(translation)
-        translation.python2_api = python2_api
+        # Only our translation classes have the python2_api attribute to
+        # start with
+        if getattr(translation, 'python2_api', None) != python2_api:
+            translation.python2_api = python2_api
         if codeset:
             translation.set_output_charset(codeset)
-        if not stacked_translations:
-            stacked_translations = translation
-        else:
-            stacked_translations.add_fallback(translation)
+        translations.append(translation)
+
+    if flatten:
+        translations = _flatten_translations(mofiles, translations)
 
+    # Accumulate a translation with fallbacks to all the other mofiles
+    stacked_translations = translations[0]
+    for translation in translations[1:]:
+        stacked_translations.add_fallback(translation)
+
+    if shared:
+        stacked_translations = _shared_translations.setdefault(key,
+                stacked_translations)
     return stacked_translations
 
+def _load_translation(full_path, class_, python2_api):
+    '''Read a :term:`message catalog` into :data:`_translations`
+
+    :arg full_path: Full path to the :file:`.mo` file
+    :arg class_: Translation class to read it with
+    :arg python2_api: python2_api to give the translation object
+    :returns: The translation object in :data:`_translations` for the file
+        and class
+
+    If several threads ask for the same file at once, only one of them reads
+    it.  The others wait for it to finish and use what it read.
+    '''
+    key = (full_path, class_)
+    with _loading_locks_lock:
+        lock = _loading_locks.setdefault(key, threading.Lock())
+    with lock:
+        try:
+            translation = _translations.get(key)
+            if translation:
+                # Another thread read it while we waited
+                return translation
+            with open(full_path, 'rb') as mofile_fh:
+                try:
+                    translation = class_(mofile_fh, python2_api=python2_api)
+                except TypeError:
+                    # Only our translation classes have the python2_api
+                    # parameter
+                    translation = class_(mofile_fh)
+            return _translations.setdefault(key, translation)
+        finally:
+            with _loading_locks_lock:
+                if _loading_locks.get(key) is lock:
+                    del _loading_locks[key]
+
+def _flatten_translations(mofiles, translations):
+    '''Merge the catalogs of translation objects into the first one
+
+    :arg mofiles: Full paths to the :term:`message catalogs` that the
+        translation objects were loaded from
+    :arg translations: List of translation objects in the order that they
+        are to be searched
+    :returns: List of translation objects to search in order.  The first one
+        has the messages from as many of the following ones as could be
+        merged into it without changing the results and the rest are the
+        ones that could not be merged.
+
+    Catalogs can be merged as long as they are :class:`dict` and have the
+    same charset and plural forms as the first one.  The merged catalogs are
+    saved in :data:`_flattened_catalogs`.
+    '''
+    first = translations[0]
+    if not isinstance(getattr(first, '_catalog', None), dict):
+        return translations
+
+    count = 1
+    for translation in translations[1:]:
+        if (type(translation) is not type(first)
+                or not isinstance(getattr(translation, '_catalog', None), dict)
+                or translation._charset != first._charset
+                or translation._info.get('plural-forms')
+                    != first._info.get('plural-forms')):
+            break
+        count += 1
+    if count == 1:
+        return translations
+
+    key = tuple(mofiles[:count])
+    catalog = _flattened_catalogs.get(key)
+    if catalog is None:
+        catalog = {}
+        # Catalogs found earlier take priority so they're added last
+        for translation in reversed(translations[:count]):
+            catalog.update(translation._catalog)
+        catalog = _flattened_catalogs.setdefault(key, catalog)
+
+    # first is a copy so this doesn't change the cached translation object
+    first._catalog = catalog
+    return [first] + translations[count:]
+
+class _MoCatalog(Mapping):
+    '''Read-only mapping of msgids to translations from a :file:`.mo` file
+
+    This can be used as the :attr:`_catalog` of a :class:`gettext`
+    Translations object.  Nothing is decoded when it's created.  Each lookup
+    does a binary search of the sorted table of original strings in the
+    :term:`message catalog` and decodes only the translation that was asked
+    for.  Translations are saved after they're decoded so looking up the
+    same msgid again is a dictionary lookup.
+
+    Keys are the same as in the dictionary that
+    :meth:`gettext.GNUTranslations._parse` creates: msgids for messages
+    without plural forms and ``(msgid1, plural_form_index)`` for messages
+    with them.
+
+    The :file:`.mo` file may be embedded in a larger buffer.  ``base`` is
+    where it starts.
+    '''
+    def __init__(self, buf, byte_order, msgcount, masteridx, transidx,
+            charset='ascii', base=0):
+        self._buf = buf
+        self._entry = struct.Struct(byte_order + 'II')
+        self._msgcount = msgcount
+        self._masteridx = base + masteridx
+        self._transidx = base + transidx
+        self._base = base
+        self.charset = charset
+        self._decoded = {}
+
+    def _original(self, index):
+        length, offset = self._entry.unpack_from(self._buf,
+                self._masteridx + 8 * index)
+        offset += self._base
+        return self._buf[offset:offset + length]
+
+    def _translation(self, index):
+        length, offset = self._entry.unpack_from(self._buf,
+                self._transidx + 8 * index)
+        offset += self._base
+        return self._buf[offset:offset + length]
+
+    def _find(self, msgid):
+        '''Return the index of a byte msgid in the catalog or -1'''
+        low = 0
+        high = self._msgcount
+        while low < high:
+            middle = (low + high) // 2
+            # Messages with plural forms are stored as msgid1\0msgid2 but
+            # sorted by msgid1
+            original = self._original(middle).split(b'\0', 1)[0]
+            if original < msgid:
+                low = middle + 1
+            elif original > msgid:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def __getitem__(self, key):
+        try:
+            return self._decoded[key]
+        except KeyError:
+            pass
+
+        if isinstance(key, tuple):
+            msgid, plural_form = key
+        else:
+            msgid, plural_form = key, None
+        try:
+            index = self._find(msgid.encode(self.charset))
+        except (AttributeError, UnicodeError):
+            raise KeyError(key)
+        if index < 0:
+            raise KeyError(key)
+
+        has_plurals = b'\0' in self._original(index)
+        translation = self._translation(index)
+        if plural_form is None:
+            if has_plurals:
+                raise KeyError(key)
+        else:
+            translations = translation.split(b'\0')
+            if not has_plurals or plural_form not in range(len(translations)):
+                raise KeyError(key)
+            translation = translations[plural_form]
+
+        message = str(translation, self.charset)
+        self._decoded[key] = message
+        return message
+
+    def __iter__(self):
+        for index in range(self._msgcount):
+            msgids = self._original(index).split(b'\0')
+            if len(msgids) == 1:
+                yield str(msgids[0], self.charset)
+            else:
+                msgid1 = str(msgids[0], self.charset)
+                for plural_form in range(
+                        len(self._translation(index).split(b'\0'))):
+                    yield (msgid1, plural_form)
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+
+class LazyGNUTranslations(NewGNUTranslations):
+    ''':class:`NewGNUTranslations` that reads messages on demand
+
+    :class:`gettext.GNUTranslations` and :class:`NewGNUTranslations` decode
+    every message in the :term:`message catalog` into a dictionary when the
+    catalog is loaded.  For large catalogs that takes a lot of time and
+    memory, most of which is spent on messages that the program never shows.
+    This class :mod:`mmap`'s the :term:`message catalog` instead and only
+    reads the header when it's loaded.  When a message is looked up, it
+    binary searches the catalog's table of original strings (which the
+    :file:`.mo` format keeps sorted) and decodes just that translation.
+
+    The methods return the same :class:`str` and :class:`bytes` as
+    :class:`NewGNUTranslations`.  Use it by passing it as the ``class_``
+    parameter of :func:`get_translation_object`::
+
+        translations = get_translation_object('foo', class_=LazyGNUTranslations,
+                python2_api=False)
+
+    .. note::
+
+        Since the :term:`message catalog` is mapped into memory,
+        the translation object reflects changes to the file on disk.  Install
+        new catalogs by writing a new file and renaming it over the old one
+        rather than rewriting the file in place.
+
+    .. versionadded:: kitchen-1.2.7 ; API kitchen.i18n 2.3.0
+    '''
+    #pylint: disable-msg=C0103,C0111
+    def _parse(self, fp):
+        filename = getattr(fp, 'name', '')
+        try:
+            buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, ValueError, OSError):
+            # Not a file on disk (or an empty file which can't be mapped)
+            buf = fp.read()
+        self._parse_buffer(buf, filename=filename)
+
+    def _parse_buffer(self, buf, base=0, filename=''):
+        '''Load the :file:`.mo` file that starts at ``base`` in ``buf``'''
+        buflen = len(buf)
+        magic = (struct.unpack('<I', buf[base:base + 4])[0]
+                if buflen >= base + 4 else None)
+        if magic == self.LE_MAGIC:
+            byte_order = '<'
+        elif magic == self.BE_MAGIC:
+            byte_order = '>'
+        else:
+            raise IOError(0, 'Bad magic number', filename)
+        version, msgcount, masteridx, transidx = struct.unpack(
+                byte_order + '4I', buf[base + 4:base + 20])
+        major_version = self._get_versions(version)[0]
+        if major_version not in self.VERSIONS:
+            raise IOError(0, 'Bad version number ' + str(major_version),
+                    filename)
+        if base + max(masteridx, transidx) + 8 * msgcount > buflen:
+            raise IOError(0, 'File is corrupt', filename)
+
+        self.plural = lambda n: int(n != 1) # germanic plural by default
+        self._catalog = _MoCatalog(buf, byte_order, msgcount, masteridx,
+                transidx, base=base)
+
+        # The catalog description is the translation of the empty msgid.
+        # Since the original strings are sorted, it is the first entry
+        if msgcount and not self._catalog._original(0):
+            self._parse_description(self._catalog._translation(0))
+        self._catalog.charset = self._charset or 'ascii'
+
+    def _parse_description(self, description):
+        # Adapted from gettext.GNUTranslations._parse()
+        lastk = None
+        for b_item in description.split(b'\n'):
+            item = b_item.decode().strip()
+            if not item:
+                continue
+            # Skip over comment lines:
+            if item.startswith('#-#-#-#-#') and item.endswith('#-#-#-#-#'):
+                continue
+            k = v = None
+            if ':' in item:
+                k, v = item.split(':', 1)
+                k = k.strip().lower()
+                v = v.strip()
+                self._info[k] = v
+                lastk = k
+            elif lastk:
+                self._info[lastk] += '\n' + item
+            if k == 'content-type':
+                self._charset = v.split('charset=')[1]
+            elif k == 'plural-forms':
+                v = v.split(';')
+                plural = v[1].split('plural=')[1]
+                self.plural = _plural_function(plural)
+
+
+def _charset_name(charset):
+    '''Return the name that :mod:`codecs` uses for a charset
+
+    Charsets that codecs doesn't know are lowercased.  Names are saved in
+    :data:`_charset_names`.
+    '''
+    try:
+        return _charset_names[charset]
+    except KeyError:
+        pass
+    try:
+        name = codecs.lookup(charset).name
+    except LookupError:
+        name = charset.lower()
+    return _charset_names.setdefault(charset, name)
+
+def _plural_function(expression, table=None):
+    '''Return a function that computes the plural form index for a number
+
+    :arg expression: The C expression from the plural forms header of
+        a :term:`message catalog`
+    :kwarg table: Sequence of the plural form indexes for 0 to
+        :data:`_PLURAL_TABLE_SIZE` if they have already been computed
+    :returns: A function that returns the same results as
+        :func:`gettext.c2py` but looks up the answer for ints from 0 to
+        :data:`_PLURAL_TABLE_SIZE` and uses :data:`_COMMON_PLURALS` to
+        compute it for larger ints when it can.
+
+    Functions are saved in :data:`_plural_functions` so that each expression
+    is only compiled and tabulated once.
+    '''
+    try:
+        return _plural_functions[expression]
+    except KeyError:
+        pass
+
+    compiled = gettext.c2py(expression)
+    evaluate = _COMMON_PLURALS.get(''.join(expression.split()), compiled)
+    if table is None or len(table) != _PLURAL_TABLE_SIZE:
+        table = tuple(compiled(n) for n in range(_PLURAL_TABLE_SIZE))
+    def plural(n):
+        # bools and other int subclasses go through compiled() like they
+        # would in gettext
+        if type(n) is int:
+            if 0 <= n < _PLURAL_TABLE_SIZE:
+                return table[n]
+            return evaluate(n)
+        return compiled(n)
+
+    return _plural_functions.setdefault(expression, plural)
+
+def _find_catalogs(domain, localedirs, languages):
+    '''Find the :term:`message catalogs` for a domain
+
+    :arg domain: Name of the message domain
+    :arg localedirs: Iterator of directories to look for
+        :term:`message catalogs` under.  The default localedir is searched
+        after these.
+    :arg languages: Iterator of language codes to look for or :data:`None`
+        to use the languages from the user's environment
+    :returns: tuple of the full paths to the :term:`message catalogs` that
+        were found, in the order that they should be used
+
+    The results are saved in :data:`_catalog_paths` and reused when the same
+    domain, localedirs, and languages are asked for again.
+    '''
+    localedirs = tuple(itertools.chain(localedirs, (_DEFAULT_LOCALEDIR,)))
+    if languages is None:
+        # gettext.find() takes the languages from the environment so
+        # a change to these has to be a different entry in the cache
+        key = (domain, localedirs, None,
+                tuple(map(os.environ.get, _LANGUAGE_ENVVARS)))
+    else:
+        languages = tuple(languages)
+        key = (domain, localedirs, languages)
+    if not all(map(os.path.isabs, localedirs)):
+        # Relative localedirs mean different catalogs when the working
+        # directory changes
+        key = key + (os.getcwd(),)
+
+    try:
+        return _catalog_paths[key]
+    except KeyError:
+        pass
+
+    mofiles = tuple(os.path.abspath(mofile) for localedir in localedirs
+            for mofile in gettext.find(domain, localedir, languages, all=True))
+    _catalog_paths[key] = mofiles
+    return mofiles
+
+def clear_catalog_cache():
+    '''Forget the :term:`message catalogs` that have been found and loaded
+
+    :func:`get_translation_object` remembers where it found the
+    :term:`message catalogs` for each domain and set of languages and keeps
+    the catalogs that it has read in memory.  Call this function after
+    installing, updating, or removing :term:`message catalogs` in a running
+    program so that the next call to :func:`get_translation_object` searches
+    the filesystem and reads the catalogs again.  Translation objects that
+    were returned earlier are not changed.
+
+    .. versionadded:: kitchen-1.2.7 ; API kitchen.i18n 2.3.0
+    '''
+    _catalog_paths.clear()
+    _translations.clear()
+    _flattened_catalogs.clear()
+    _shared_translations.clear()
+
+def preload_catalogs(domain, localedirs=tuple(), languages=None, class_=None,
+        codeset=None, freeze=True):
+    '''Load the :term:`message catalogs` for a domain before forking
+
+    :arg domain: Name of the message domain
+    :kwarg localedirs: Iterator of directories to look for
+        :term:`message catalogs` under.  Same as for
+        :func:`get_translation_object`.
+    :kwarg languages: Iterator of language codes that the child processes
+        will ask for.  If unspecified, the user's locale settings are used.
+    :kwarg class_: The class to read the :term:`message catalogs` with.
+        Defaults to :class:`NewGNUTranslations`.
+    :kwarg codeset: Character encoding that the child processes will ask
+        for when they call :func:`get_translation_object`
+    :kwarg freeze: If :data:`True`, the default, call :func:`gc.freeze`
+        after loading so that the garbage collector leaves everything that
+        exists at that point alone.  This affects all of the objects in the
+        process, not only the catalogs.
+    :returns: :class:`dict` mapping each language to the translation object
+        that ``get_translation_object(domain, localedirs, [language],
+        class_=class_, codeset=codeset, python2_api=False, shared=True)``
+        returns.  If ``languages`` was unspecified the only key is
+        :data:`None`.
+
+    Servers that fork worker processes can call this in the parent so that
+    the workers share the catalogs instead of each reading them after the
+    fork.  The catalog files are found and parsed, the plural forms are
+    tabulated, and a shared translation object is set up for each language.
+    Workers that then call :func:`get_translation_object` with the same
+    parameters and ``python2_api=False, shared=True`` (or use the returned
+    objects directly) only look up what the parent made.
+
+    Pages that the parent and the workers share stay shared until one of
+    them writes to the page.  Looking up a message still changes the
+    reference count of the strings that are looked up.  However, without
+    :func:`gc.freeze` the first garbage collection in every worker would
+    write to every catalog that was loaded.  :class:`LazyGNUTranslations`
+    keeps the catalog in the mapped :file:`.mo` file, which the workers
+    always share, and only decodes the messages that a worker uses.
+
+    .. versionadded:: kitchen-1.2.7 ; API kitchen.i18n 2.3.0
+    '''
+    if languages is None:
+        language_lists = [None]
+    else:
+        language_lists = [[language] for language in languages]
+
+    preloaded = {}
+    for language_list in language_lists:
+        translations = get_translation_object(domain, localedirs=localedirs,
+                languages=language_list, class_=class_, codeset=codeset,
+                python2_api=False, shared=True)
+        # The charsets that the gettext methods compare
+        for charset in (getattr(translations, '_charset', None), codeset,
+                'utf-8', locale.getpreferredencoding()):
+            if charset:
+                _charset_name(charset)
+        preloaded[language_list and language_list[0]] = translations
+
+    if freeze and hasattr(gc, 'freeze'):
+        gc.freeze()
+    return preloaded
+
 def easy_gettext_setup(domain, localedirs=tuple(), use_unicode=True):
     ''' Setup translation functions for an application
 
@@ -892,5 +1572,6 @@ def easy_gettext_setup(domain, localedirs=tuple(), use_unicode=True):
         return(translations.gettext, translations.ngettext)
     return(translations.lgettext, translations.lngettext)
 
-__all__ = ('DummyTranslations', 'NewGNUTranslations', 'easy_gettext_setup',
-        'get_translation_object')
+__all__ = ('DummyTranslations', 'LazyGNUTranslations', 'NewGNUTranslations',
+        'clear_catalog_cache', 'easy_gettext_setup', 'get_translation_object',
+        'preload_catalogs')
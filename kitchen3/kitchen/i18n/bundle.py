@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+#
+# kitchen is free software; you can redistribute it and/or modify it under the
+# terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 2.1 of the License, or (at your option)
+# any later version.
+#
+# kitchen is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for
+# more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with kitchen; if not, see <http://www.gnu.org/licenses/>
+'''
+-------------------
+Translation bundles
+-------------------
+
+A translation bundle holds every :term:`message catalog` for a domain in
+a single file.  Programs that start many processes (for instance, a server
+that forks workers) can load the bundle instead of searching the
+localedirs and reading each :term:`message catalog` separately.
+
+Build the bundle when installing the program::
+
+    $ python3 -m kitchen.i18n.bundle myprogram myprogram.bundle \
+            /usr/share/myprogram/locale
+
+or::
+
+    from kitchen.i18n.bundle import write_bundle
+    write_bundle('myprogram', 'myprogram.bundle',
+            localedirs=('/usr/share/myprogram/locale',))
+
+and load it when the program starts::
+
+    from kitchen.i18n.bundle import TranslationBundle
+    bundle = TranslationBundle('myprogram.bundle')
+    translations = bundle.get_translation_object()
+    _ = translations.gettext
+
+The bundle is read with a single :func:`mmap.mmap`.  The strings in it are
+stored as :term:`UTF-8` and the plural form indexes for small numbers are
+stored precomputed so that nothing has to be converted when it's loaded.
+Messages are decoded when they are looked up, the same way that
+:class:`~kitchen.i18n.LazyGNUTranslations` does it.
+
+.. versionadded:: kitchen-1.2.7 ; API kitchen.i18n 2.3.0
+'''
+import argparse
+import copy
+from errno import ENOENT
+import gettext
+import itertools
+import mmap
+import os
+import struct
+import sys
+
+from kitchen.i18n import _DEFAULT_LOCALEDIR, _LANGUAGE_ENVVARS, \
+        _PLURAL_TABLE_SIZE, _plural_function, DummyTranslations, \
+        LazyGNUTranslations
+
+#: First bytes of a translation bundle
+BUNDLE_MAGIC = b'KTCHNI18'
+
+#: Version of the bundle format that :func:`write_bundle` writes
+BUNDLE_VERSION = 1
+
+# Magic, version, and number of catalogs
+_HEADER = struct.Struct('<8sII')
+
+# For each catalog: the position of its localedir in the list that was
+# searched followed by the offset and length of the language name, the
+# .mo file, the plural expression, and the table of plural form indexes
+_INDEX_ENTRY = struct.Struct('<9I')
+
+def _expand_languages(languages):
+    '''Return the languages to search for the way that :func:`gettext.find`
+    does'''
+    if languages is None:
+        languages = []
+        for envar in _LANGUAGE_ENVVARS:
+            value = os.environ.get(envar)
+            if value:
+                languages = value.split(':')
+                break
+        if 'C' not in languages:
+            languages.append('C')
+
+    expanded = []
+    for language in languages:
+        for expanded_language in gettext._expand_lang(language):
+            if expanded_language not in expanded:
+                expanded.append(expanded_language)
+    if 'C' in expanded:
+        del expanded[expanded.index('C'):]
+    return expanded
+
+def _write_mo(messages):
+    '''Return the bytes of a little endian :file:`.mo` file
+
+    :arg messages: :class:`dict` mapping byte originals to byte translations
+    '''
+    originals = sorted(messages)
+    offset = 28 + 16 * len(originals)
+    tables = []
+    strings = []
+    for string_list in (originals, [messages[o] for o in originals]):
+        table = []
+        for string in string_list:
+            table.append(struct.pack('<II', len(string), offset))
+            strings.append(string + b'\0')
+            offset += len(string) + 1
+        tables.append(b''.join(table))
+    header = struct.pack('<7I', LazyGNUTranslations.LE_MAGIC, 0,
+            len(originals), 28, 28 + 8 * len(originals), 0, 0)
+    return b''.join([header] + tables + strings)
+
+def _utf8_catalog(filename):
+    '''Read a :term:`message catalog` and convert it for a bundle
+
+    :arg filename: :file:`.mo` file to read
+    :returns: tuple of the :file:`.mo` file with its strings converted to
+        :term:`UTF-8`, the plural expression from its header, and the
+        table of plural form indexes
+    '''
+    with open(filename, 'rb') as mofile:
+        translation = LazyGNUTranslations(mofile, python2_api=False)
+    catalog = translation._catalog
+    messages = {}
+    for index in range(catalog._msgcount):
+        original = catalog._original(index)
+        translated = catalog._translation(index)
+        if original:
+            original = str(original, catalog.charset).encode('utf-8')
+            translated = str(translated, catalog.charset).encode('utf-8')
+        # The header is copied as it is.  It keeps naming the catalog's own
+        # charset so that the translation objects return bytes in the same
+        # charset as the catalog does.
+        messages[original] = translated
+
+    try:
+        # Same as gettext.GNUTranslations._parse()
+        expression = translation._info['plural-forms'].split(';')[1].split(
+                'plural=')[1]
+    except (KeyError, IndexError):
+        expression = ''
+    table = bytes(translation.plural(n) for n in range(_PLURAL_TABLE_SIZE))
+    return (_write_mo(messages), expression, table)
+
+def write_bundle(domain, filename, localedirs=tuple()):
+    '''Write the :term:`message catalogs` for a domain into a bundle
+
+    :arg domain: Name of the message domain
+    :arg filename: File to write the bundle to
+    :kwarg localedirs: Iterator of directories to look for
+        :term:`message catalogs` under.  Like
+        :func:`~kitchen.i18n.get_translation_object`, the default localedir is
+        searched after these.
+    :returns: Number of :term:`message catalogs` that were put into the
+        bundle
+
+    Every language that has a :term:`message catalog` for the domain in one
+    of the localedirs goes into the bundle.  The bundle is written to
+    a temporary file that is renamed to ``filename`` when it's complete so
+    programs that have the old bundle open keep working.
+    '''
+    entries = []
+    for group, localedir in enumerate(itertools.chain(localedirs,
+            (_DEFAULT_LOCALEDIR,))):
+        try:
+            languages = sorted(os.listdir(localedir))
+        except OSError:
+            continue
+        for language in languages:
+            mofile = os.path.join(localedir, language, 'LC_MESSAGES',
+                    '%s.mo' % domain)
+            if os.path.isfile(mofile):
+                entries.append((group, language.encode('utf-8'))
+                        + _utf8_catalog(mofile))
+
+    offset = _HEADER.size + _INDEX_ENTRY.size * len(entries)
+    index = []
+    data = []
+    for entry in entries:
+        fields = [entry[0]]
+        for blob in entry[1:]:
+            if isinstance(blob, str):
+                blob = blob.encode('utf-8')
+            fields.extend((offset, len(blob)))
+            data.append(blob)
+            offset += len(blob)
+        index.append(_INDEX_ENTRY.pack(*fields))
+
+    tmp_filename = '%s.%s.tmp' % (filename, os.getpid())
+    with open(tmp_filename, 'wb') as bundle:
+        bundle.write(_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(entries)))
+        bundle.write(b''.join(index))
+        bundle.write(b''.join(data))
+    os.rename(tmp_filename, filename)
+    return len(entries)
+
+
+class TranslationBundle(object):
+    '''Translation objects from a bundle written by :func:`write_bundle`
+
+    :arg filename: The bundle file
+    :raises IOError: if the file isn't a bundle that this version of kitchen
+        can read
+
+    The bundle is mapped into memory once.  The :term:`message catalog` for
+    a language is set up the first time it's needed and shared by all of the
+    translation objects that use it afterwards.
+    '''
+    def __init__(self, filename):
+        with open(filename, 'rb') as bundle:
+            try:
+                self._buf = mmap.mmap(bundle.fileno(), 0,
+                        access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                self._buf = b''
+        self.filename = filename
+
+        if len(self._buf) < _HEADER.size:
+            raise IOError(0, 'Not a translation bundle', filename)
+        magic, version, count = _HEADER.unpack_from(self._buf)
+        if magic != BUNDLE_MAGIC:
+            raise IOError(0, 'Not a translation bundle', filename)
+        if version != BUNDLE_VERSION:
+            raise IOError(0, 'Unsupported translation bundle version %s'
+                    % version, filename)
+
+        # (localedir position, language) => index entry
+        self._index = {}
+        for number in range(count):
+            fields = _INDEX_ENTRY.unpack_from(self._buf,
+                    _HEADER.size + _INDEX_ENTRY.size * number)
+            language = str(self._buf[fields[1]:fields[1] + fields[2]],
+                    'utf-8')
+            self._index[(fields[0], language)] = fields[3:]
+        self._groups = sorted(set(group for group, language in self._index))
+        self._translations = {}
+
+    def languages(self):
+        '''Return the languages that have :term:`message catalogs` in the
+        bundle'''
+        return sorted(set(language for group, language in self._index))
+
+    def _translation(self, key):
+        try:
+            return self._translations[key]
+        except KeyError:
+            pass
+        mo_offset, mo_length, plural_offset, plural_length, table_offset, \
+                table_length = self._index[key]
+        expression = str(self._buf[plural_offset:plural_offset
+            + plural_length], 'utf-8')
+        if expression:
+            # Put the precomputed table into the shared plural functions
+            # before the catalog's header asks for it
+            _plural_function(expression,
+                    self._buf[table_offset:table_offset + table_length])
+
+        translation = LazyGNUTranslations(python2_api=False)
+        translation._parse_buffer(self._buf, mo_offset,
+                filename='%s:%s' % (self.filename, key[1]))
+        # The header names the catalog's original charset but the strings
+        # were converted to utf-8
+        translation._catalog.charset = 'utf-8'
+        return self._translations.setdefault(key, translation)
+
+    def get_translation_object(self, languages=None, fallback=True,
+            codeset=None, python2_api=False):
+        '''Get a translation object for the :term:`message catalogs` in the
+        bundle
+
+        :kwarg languages: Iterator of language codes to use.  If unspecified,
+            the user's locale settings will be used.
+        :kwarg fallback: If set to :data:`False`, raise an :exc:`IOError` if
+            there aren't :term:`message catalogs` for any of the languages.
+            If :data:`True`, the default, return
+            a :class:`~kitchen.i18n.DummyTranslations` object.
+        :kwarg codeset: Set the character encoding to use when returning byte
+            :class:`bytes` objects.
+        :kwarg python2_api: When :data:`True`, return translation objects that
+            use the python2 gettext api.  Default is :data:`False`.
+        :returns: Translation object that searches the
+            :term:`message catalogs` in the same order that
+            :func:`~kitchen.i18n.get_translation_object` would search the
+            localedirs that the bundle was made from.
+
+        The parameters have the same meaning as in
+        :func:`kitchen.i18n.get_translation_object`.
+        '''
+        languages = _expand_languages(languages)
+        keys = [(group, language) for group in self._groups
+                for language in languages if (group, language) in self._index]
+        if not keys:
+            if fallback:
+                return DummyTranslations(python2_api=python2_api)
+            raise IOError(ENOENT, 'No translation file found in bundle',
+                    self.filename)
+
+        stacked_translations = None
+        for key in keys:
+            # Shallow copy the object so that the fallbacks and output
+            # charset can differ but the catalog is shared.
+            translation = copy.copy(self._translation(key))
+            translation.python2_api = python2_api
+            if codeset:
+                translation.set_output_charset(codeset)
+            if not stacked_translations:
+                stacked_translations = translation
+            else:
+                stacked_translations.add_fallback(translation)
+        return stacked_translations
+
+def main(args=None):
+    '''Write a translation bundle from the command line'''
+    parser = argparse.ArgumentParser(prog='python3 -m kitchen.i18n.bundle',
+            description='Put the message catalogs for a domain into'
+            ' a translation bundle')
+    parser.add_argument('domain', help='message domain')
+    parser.add_argument('filename', help='bundle file to write')
+    parser.add_argument('localedirs', nargs='*',
+            help='directories to look for message catalogs under, before'
+            ' %s' % _DEFAULT_LOCALEDIR)
+    options = parser.parse_args(args)
+    count = write_bundle(options.domain, options.filename, options.localedirs)
+    print('%s: %s message catalogs' % (options.filename, count))
+    return 0
+
+__all__ = ('BUNDLE_MAGIC', 'BUNDLE_VERSION', 'TranslationBundle',
+        'write_bundle')
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,7 +11,7 @@ and displaying text on the screen.
 
 from kitchen.versioning import version_tuple_to_string
 
-__version_info__ = ((2, 2, 0),)
+__version_info__ = ((2, 3, 0),)
 __version__ = version_tuple_to_string(__version_info__)
 
 __all__ = ('converters', 'exceptions', 'misc',)
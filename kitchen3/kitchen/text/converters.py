@@ -40,16 +40,26 @@ strings.
     we've simplified :func:`~kitchen.text.converters.exception_to_unicode` and
     :func:`~kitchen.text.converters.exception_to_bytes` to make it unnecessary
 
+.. versionchanged:: kitchen 1.2.7 ; API kitchen.text 2.3.0
+    Added :func:`~kitchen.text.converters.to_unicode_many`,
+    :func:`~kitchen.text.converters.to_bytes_many`,
+    :func:`~kitchen.text.converters.getreader`,
+    :func:`~kitchen.text.converters.write_xml`,
+    :func:`~kitchen.text.converters.iter_xml_to_unicode`, and
+    :func:`~kitchen.text.converters.guess_encoding_to_xml_many`
+
 '''
 from base64 import b64encode, b64decode
 
 import codecs
+import itertools
+import re
 import warnings
-import xml.sax.saxutils
 
-from kitchen.text.exceptions import ControlCharError, XmlEncodeError
+from kitchen.text.exceptions import XmlEncodeError
 from kitchen.text.misc import guess_encoding, html_entities_unescape, \
-        isbytestring, isunicodestring, process_control_chars
+        isbytestring, isunicodestring, _CONTROL_CHARS_RE, _guess_encodings, \
+        _IGNORE_TABLE, _REPLACE_TABLE
 
 #: Aliases for the utf-8 codec
 _UTF8_ALIASES = frozenset(('utf-8', 'UTF-8', 'utf8', 'UTF8', 'utf_8', 'UTF_8',
@@ -61,6 +71,28 @@ _LATIN1_ALIASES = frozenset(('latin-1', 'LATIN-1', 'latin1', 'LATIN1',
 
 # EXCEPTION_CONVERTERS is defined below due to using to_unicode
 
+# What _xml_escape() does for each combination of the control_chars and attrib
+# parameters: the table to translate control characters with (None to raise
+# an error) and the entities to replace, '&' first
+_XML_ESCAPES = {}
+for _control_chars, _control_table in (('replace', _REPLACE_TABLE),
+        ('ignore', _IGNORE_TABLE), ('strict', None)):
+    _XML_ESCAPES[(_control_chars, False)] = (_control_table,
+            (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;')))
+    _XML_ESCAPES[(_control_chars, True)] = (_control_table,
+            (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;')))
+del _control_chars, _control_table
+
+# The end of a string that may be the start of an entity that continues in the
+# next chunk that iter_xml_to_unicode() decodes
+_PARTIAL_ENTITY_RE = re.compile(r'&#?\w*\Z')
+
+#: Number of strings that :func:`guess_encoding_to_xml_many` converts together
+_XML_MANY_BATCH_SIZE = 1024
+
+#: Number of characters that :func:`write_xml` collects before writing them
+_XML_WRITE_SIZE = 65536
+
 def to_unicode(obj, encoding='utf-8', errors='replace', nonstring=None,
         non_string=None):
     '''Convert an object into a :class:`str` string
@@ -274,6 +306,125 @@ def to_bytes(obj, encoding='utf-8', errors='replace', nonstring=None,
     raise TypeError('nonstring value, %(param)s, is not set to a valid'
         ' action' % {'param': nonstring})
 
+def _canonical_encoding(encoding):
+    '''Return the name python's fast paths know for utf-8 and latin-1
+
+    :arg encoding: name of an encoding
+    :returns: ``utf-8`` or ``latin-1`` if :attr:`encoding` is one of their
+        aliases in :data:`_UTF8_ALIASES` or :data:`_LATIN1_ALIASES`.
+        Otherwise :attr:`encoding` unchanged.
+    '''
+    if encoding in _UTF8_ALIASES:
+        return 'utf-8'
+    if encoding in _LATIN1_ALIASES:
+        return 'latin-1'
+    return encoding
+
+def to_unicode_many(objs, encoding='utf-8', errors='replace', nonstring=None,
+        non_string=None):
+    '''Convert many objects into :class:`str` strings
+
+    :arg objs: iterable of objects to convert to :class:`str` strings.  These
+        should normally be byte :class:`bytes`
+    :kwarg encoding: What encoding to try converting the byte :class:`bytes`
+        as.  Defaults to :term:`utf-8`
+    :kwarg errors: If errors are found while decoding, perform this action.
+        See :func:`to_unicode` for the possible values.  Defaults to
+        ``replace``
+    :kwarg nonstring: How to treat nonstring values.  See :func:`to_unicode`
+        for the possible values.  Default is ``simplerepr``
+    :kwarg non_string: *Deprecated* Use :attr:`nonstring` instead
+    :raises TypeError: when a nonstring object is reached if
+        :attr:`nonstring` is ``strict`` or set to an unknown value
+    :raises UnicodeDecodeError: when a byte :class:`bytes` that is not
+        decodable using the given encoding is reached if :attr:`errors` is
+        ``strict``
+    :returns: iterator that yields the result of :func:`to_unicode` for each
+        object in :attr:`objs` in turn
+
+    Calling :func:`to_unicode` on every item of a big batch repeats the work
+    of sorting out the keyword arguments and looking up the encoding for
+    each item.  This does that once for the whole batch.  :class:`str` strings
+    are passed straight through and byte :class:`bytes` are decoded directly.
+    Anything else is handed to :func:`to_unicode` so every :attr:`nonstring`
+    strategy works exactly as it does there::
+
+        >>> list(to_unicode_many([b'caf\\xc3\\xa9', 'caf\\xe9', 5]))
+        ['café', 'café', '5']
+
+    The conversion happens as the iterator is consumed so this works on
+    iterables of any size.  Wrap it in :func:`list` if you need a list.
+
+    .. versionadded:: kitchen 1.2.7, API: kitchen.text 2.3.0
+    '''
+    if non_string:
+        warnings.warn('non_string is a deprecated parameter of'
+            ' to_unicode_many().  Use nonstring instead', DeprecationWarning,
+            stacklevel=2)
+        if not nonstring:
+            nonstring = non_string
+    return _to_unicode_many(objs, _canonical_encoding(encoding), errors,
+            nonstring)
+
+def _to_unicode_many(objs, encoding, errors, nonstring):
+    '''Generator doing the work for :func:`to_unicode_many`'''
+    for obj in objs:
+        if isinstance(obj, str):
+            yield obj
+        elif isinstance(obj, (bytes, bytearray)):
+            yield str(obj, encoding, errors)
+        else:
+            yield to_unicode(obj, encoding=encoding, errors=errors,
+                    nonstring=nonstring)
+
+def to_bytes_many(objs, encoding='utf-8', errors='replace', nonstring=None,
+        non_string=None):
+    '''Convert many objects into byte :class:`bytes`
+
+    :arg objs: iterable of objects to convert to byte :class:`bytes`.  These
+        should normally be :class:`str` strings
+    :kwarg encoding: Encoding to use to convert the :class:`str` strings
+        into byte :class:`bytes`.  Defaults to :term:`utf-8`
+    :kwarg errors: If errors are found while encoding, perform this action.
+        See :func:`to_bytes` for the possible values.  Defaults to ``replace``
+    :kwarg nonstring: How to treat nonstring values.  See :func:`to_bytes` for
+        the possible values.  Default is ``simplerepr``
+    :kwarg non_string: *Deprecated* Use :attr:`nonstring` instead
+    :raises TypeError: when a nonstring object is reached if
+        :attr:`nonstring` is ``strict`` or set to an unknown value
+    :raises UnicodeEncodeError: when a :class:`str` string that is not
+        encodable using the given encoding is reached if :attr:`errors` is
+        ``strict``
+    :returns: iterator that yields the result of :func:`to_bytes` for each
+        object in :attr:`objs` in turn
+
+    This is the byte :class:`bytes` counterpart of :func:`to_unicode_many`.
+    Byte :class:`bytes` are passed straight through unmodified, just as
+    :func:`to_bytes` does, and :class:`str` strings are encoded directly.
+    Anything else is handed to :func:`to_bytes`.
+
+    .. versionadded:: kitchen 1.2.7, API: kitchen.text 2.3.0
+    '''
+    if non_string:
+        warnings.warn('non_string is a deprecated parameter of'
+            ' to_bytes_many().  Use nonstring instead', DeprecationWarning,
+            stacklevel=2)
+        if not nonstring:
+            nonstring = non_string
+    return _to_bytes_many(objs, _canonical_encoding(encoding), errors,
+            nonstring)
+
+def _to_bytes_many(objs, encoding, errors, nonstring):
+    '''Generator doing the work for :func:`to_bytes_many`'''
+    for obj in objs:
+        if isinstance(obj, (bytes, bytearray)):
+            yield obj
+        elif isinstance(obj, str):
+            yield obj.encode(encoding, errors)
+        else:
+            yield to_bytes(obj, encoding=encoding, errors=errors,
+                    nonstring=nonstring)
+
 def getwriter(encoding):
     '''Return a :class:`codecs.StreamWriter` that resists tracing back.
 
@@ -299,6 +450,14 @@ def getwriter(encoding):
        ``strict``.  Like :class:`codecs.StreamWriter`, the returned
        :class:`~codecs.StreamWriter` can have its error handler changed in
        code by setting ``stream.errors = 'new_handler_name'``
+    3) The :class:`~codecs.StreamWriter` can buffer its output.  When it is
+       created with a positive ``buffer_size``, writes are saved up and
+       encoded together once ``buffer_size`` characters (or bytes) have
+       accumulated, or when a newline is written if ``line_buffering`` is
+       :data:`True` (the default).  The bytes that are output are the same
+       as when writing unbuffered.  Call :meth:`flush` to write out the
+       buffer at other times.  Turning ``line_buffering`` off saves the most
+       work when a program prints many short lines.
 
     Example usage::
 
@@ -319,6 +478,12 @@ def getwriter(encoding):
         >>> print u'caf\\xe9'
         caf?
 
+    To save up the output of a program that prints many lines and write it
+    out in larger pieces::
+
+        >>> sys.stdout = UTF8Writer(unwrapped_stdout.buffer, buffer_size=8192,
+        ...         line_buffering=False)
+
     .. seealso::
 
         API docs for :class:`codecs.StreamWriter` and :func:`codecs.getwriter`
@@ -326,6 +491,12 @@ def getwriter(encoding):
         python wiki.
 
     .. versionadded:: kitchen 0.2a2, API: kitchen.text 1.1.0
+    .. versionchanged:: kitchen 1.2.7, API: kitchen.text 2.3.0
+        :class:`str` strings are encoded with the encoding's incremental
+        encoder so stateful encodings (for instance, the byte order mark of
+        ``utf-16``) are only started once per stream instead of once per
+        write.  Added the ``buffer_size`` and ``line_buffering`` keyword
+        arguments to the returned :class:`~codecs.StreamWriter`.
     '''
     class _StreamWriter(codecs.StreamWriter):
         # :W0223: We don't need to implement all methods of StreamWriter.
@@ -334,18 +505,192 @@ def getwriter(encoding):
         # :C0111: We're implementing an API from the stdlib.  Just point
         #   people at that documentation instead of writing docstrings here.
         #pylint:disable-msg=W0223,C0111
-        def __init__(self, stream, errors='replace'):
+        def __init__(self, stream, errors='replace', buffer_size=0,
+                line_buffering=True):
             codecs.StreamWriter.__init__(self, stream, errors)
+            # The incremental encoder keeps the state of stateful encodings
+            # (like the utf-16 BOM) from one write to the next
+            self._encoder = codecs.getincrementalencoder(
+                    self._codec_encoding)(errors)
+            self.buffer_size = buffer_size
+            self.line_buffering = line_buffering
+            # str that has not been encoded yet
+            self._pending = []
+            # bytes that are waiting to be written, in order
+            self._output = []
+            self._buffered = 0
 
         def encode(self, msg, errors='replace'):
-            print(type(msg))
-            print(repr(msg))
-            return (to_bytes(msg, encoding=self.encoding, errors=errors),
-                    len(msg))
+            if isinstance(msg, (bytes, bytearray)):
+                return (msg, len(msg))
+            if not isinstance(msg, str):
+                msg = to_bytes(msg, encoding=self._codec_encoding,
+                        errors=errors)
+                return (msg, len(msg))
+            # errors can be changed on the stream at any time
+            self._encoder.errors = errors
+            return (self._encoder.encode(msg), len(msg))
+
+        def write(self, obj):
+            if self.buffer_size <= 0:
+                return codecs.StreamWriter.write(self, obj)
+
+            if isinstance(obj, str):
+                self._pending.append(obj)
+                self._buffered += len(obj)
+                if self._buffered < self.buffer_size and not (
+                        self.line_buffering and '\n' in obj):
+                    return
+            else:
+                data = self.encode(obj, self.errors)[0]
+                self._encode_pending()
+                self._output.append(data)
+                self._buffered += len(data)
+                if self._buffered < self.buffer_size and not (
+                        self.line_buffering and b'\n' in data):
+                    return
+            self._write_buffer()
+
+        def _encode_pending(self):
+            # Encoding everything that has piled up in one call is much
+            # cheaper than encoding each write on its own
+            if self._pending:
+                self._encoder.errors = self.errors
+                self._output.append(self._encoder.encode(
+                    ''.join(self._pending)))
+                self._pending = []
+
+        def _write_buffer(self):
+            if self._pending:
+                self._encoder.errors = self.errors
+                data = self._encoder.encode(''.join(self._pending))
+                self._pending = []
+                if self._output:
+                    self._output.append(data)
+                    data = b''.join(self._output)
+                    self._output = []
+                self.stream.write(data)
+            elif self._output:
+                self.stream.write(b''.join(self._output))
+                self._output = []
+            self._buffered = 0
+
+        def flush(self):
+            self._write_buffer()
+            self.stream.flush()
+
+        def close(self):
+            self._write_buffer()
+            self.stream.close()
+
+        def __exit__(self, type, value, tb):
+            self.close()
+
+        def reset(self):
+            self._write_buffer()
+            # Write out anything that a stateful encoder is holding on to
+            # and return it to its initial state
+            self._encoder.errors = self.errors
+            data = self._encoder.encode('', True)
+            if data:
+                self.stream.write(data)
+            self._encoder.reset()
 
     _StreamWriter.encoding = encoding
+    # Name that the codecs are looked up by.  encoding keeps the caller's name
+    _StreamWriter._codec_encoding = _canonical_encoding(encoding)
     return _StreamWriter
 
+def getreader(encoding):
+    '''Return a :class:`codecs.StreamReader` that resists tracing back.
+
+    :arg encoding: Encoding to use for transforming byte :class:`bytes` into
+        :class:`str` strings.
+    :rtype: :class:`codecs.StreamReader`
+    :returns: :class:`~codecs.StreamReader` that you can instantiate to wrap
+        input streams to automatically translate byte :class:`bytes` from
+        :attr:`encoding` into :class:`str` strings.
+
+    This is the reading counterpart of :func:`getwriter`.  The departures from
+    :func:`codecs.getreader` are:
+
+    1) The default error handler for undecodable bytes is to ``replace`` them
+       with the unicode replacement character (``�``) whereas
+       :func:`codecs.getreader` defaults to ``strict``.  Like
+       :class:`codecs.StreamReader`, the returned
+       :class:`~codecs.StreamReader` can have its error handler changed in
+       code by setting ``stream.errors = 'new_handler_name'``
+    2) Bytes are decoded with the encoding's incremental decoder.
+       A character whose bytes are split between two reads from the
+       underlying stream is decoded once the rest of it has been read.  If
+       the stream ends in the middle of a character, the leftover bytes are
+       handled by the error handler (so they become a ``�`` by default)
+       instead of being silently dropped.
+
+    Since data is read and decoded a piece at a time, this can be used to
+    process files of any size::
+
+        >>> from kitchen.text.converters import getreader
+        >>> UTF8Reader = getreader('utf-8')
+        >>> log = UTF8Reader(open('/var/log/messages', 'rb'))
+        >>> for line in log:
+        ...     process(line)
+
+    .. seealso::
+
+        API docs for :class:`codecs.StreamReader` and :func:`codecs.getreader`
+
+    .. versionadded:: kitchen 1.2.7, API: kitchen.text 2.3.0
+    '''
+    class _StreamReader(codecs.StreamReader):
+        # :W0223: We don't need to implement all methods of StreamReader.
+        #   This is not the actual class that gets used but a replacement for
+        #   the actual class.
+        # :C0111: We're implementing an API from the stdlib.  Just point
+        #   people at that documentation instead of writing docstrings here.
+        #pylint:disable-msg=W0223,C0111
+        def __init__(self, stream, errors='replace'):
+            codecs.StreamReader.__init__(self, stream, errors)
+            self._decoder = codecs.getincrementaldecoder(
+                    self._codec_encoding)(errors)
+
+        def decode(self, msg, errors='replace'):
+            # codecs.StreamReader holds on to the bytes that we don't consume
+            # so don't let the decoder buffer them as well.  Only the
+            # decoder's other state (byte order and the like, which may only
+            # be known once the msg has been decoded) is kept.
+            self._decoder.errors = errors
+            try:
+                decoded = self._decoder.decode(msg)
+            except UnicodeError:
+                self._decoder.setstate((b'', self._decoder.getstate()[1]))
+                raise
+            pending, flag = self._decoder.getstate()
+            self._decoder.setstate((b'', flag))
+            return (decoded, len(msg) - len(pending))
+
+        def read(self, size=-1, chars=-1, firstline=False):
+            result = codecs.StreamReader.read(self, size, chars, firstline)
+            requested = chars if chars >= 0 else size
+            # Bytes left over once the whole stream has been read or once a
+            # read comes back empty mean that the stream ended in the middle
+            # of a character
+            if self.bytebuffer and (requested < 0
+                    or (not result and requested != 0)):
+                self._decoder.errors = self.errors
+                result += self._decoder.decode(self.bytebuffer, True)
+                self.bytebuffer = b''
+            return result
+
+        def reset(self):
+            codecs.StreamReader.reset(self)
+            self._decoder.reset()
+
+    _StreamReader.encoding = encoding
+    # Name that the codecs are looked up by.  encoding keeps the caller's name
+    _StreamReader._codec_encoding = _canonical_encoding(encoding)
+    return _StreamReader
+
 def to_utf8(obj, errors='replace', non_string='passthru'):
     '''*Deprecated*
 
@@ -653,31 +998,25 @@ def unicode_to_xml(string, encoding='utf-8', attrib=False,
         :func:`guess_encoding_to_xml`
             if you're dealing with strings in unknown encodings that you don't
             need to save with char-for-char fidelity.
+
+    .. versionchanged:: kitchen 1.2.7, API: kitchen.text 2.3.0
+        :term:`control characters` are replaced or removed as documented.
+        Previously they were only checked for when :attr:`control_chars`
+        was ``strict`` and otherwise left in the output.
     '''
     if not string:
         # Small optimization
         return b''
-    try:
-        process_control_chars(string, strategy=control_chars)
-    except TypeError:
+    if not isunicodestring(string):
         raise XmlEncodeError('unicode_to_xml must have a unicode type as'
                 ' the first argument.  Use bytes_string_to_xml for byte'
                 ' strings.')
-    except ValueError:
+    if control_chars not in ('replace', 'ignore', 'strict'):
         raise ValueError('The control_chars argument to unicode_to_xml'
                 ' must be one of ignore, replace, or strict')
-    except ControlCharError as exc:
-        raise XmlEncodeError(exc.args[0])
 
-    # Escape characters that have special meaning in xml
-    if attrib:
-        string = xml.sax.saxutils.escape(string, entities={'"': "&quot;"})
-    else:
-        string = xml.sax.saxutils.escape(string)
-
-    string = string.encode(encoding, 'xmlcharrefreplace')
-
-    return string
+    string = _xml_escape(string, control_chars, attrib)
+    return string.encode(encoding, 'xmlcharrefreplace')
 
 def xml_to_unicode(byte_string, encoding='utf-8', errors='replace'):
     '''Transform a byte :class:`bytes` from an xml file into a :class:`str`
@@ -704,6 +1043,55 @@ def xml_to_unicode(byte_string, encoding='utf-8', errors='replace'):
     string = html_entities_unescape(string)
     return string
 
+def iter_xml_to_unicode(chunks, encoding='utf-8', errors='replace'):
+    '''Transform a large xml document into :class:`str` strings piece by piece
+
+    :arg chunks: Iterable of byte :class:`bytes` (for instance, blocks read
+        from a file) to decode.  :class:`str` strings are unescaped without
+        being decoded.
+    :kwarg encoding: encoding that the byte :class:`bytes` are in
+    :kwarg errors: What to do if not every character is valid in
+        :attr:`encoding`.  See the :func:`to_unicode` documentation for legal
+        values.
+    :returns: iterator of :class:`str` strings.  Joined together, they're
+        the same as what :func:`xml_to_unicode` returns for the whole
+        document.
+
+    Use this instead of :func:`xml_to_unicode` when the document is too large
+    to hold in memory twice::
+
+        with open('primary.xml', 'rb') as xml_file:
+            for text in iter_xml_to_unicode(iter(lambda: xml_file.read(65536), b'')):
+                output.write(text)
+
+    Characters, entities, and tags that are split between chunks are held
+    back until the chunk that finishes them.  A ``<`` that is never followed
+    by a ``>`` holds back the rest of the document.
+
+    .. versionadded:: kitchen 1.2.7, API: kitchen.text 2.3.0
+    '''
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    pending = ''
+    for chunk in chunks:
+        if not isinstance(chunk, str):
+            chunk = decoder.decode(chunk)
+        string = pending + chunk
+        # Hold back a tag that isn't closed yet
+        end = string.find('<', string.rfind('>') + 1)
+        if end < 0:
+            end = len(string)
+        # and an entity that may continue in the next chunk
+        partial = _PARTIAL_ENTITY_RE.search(string, 0, end)
+        if partial:
+            end = partial.start()
+        pending = string[end:]
+        if end:
+            yield html_entities_unescape(string[:end])
+
+    string = pending + decoder.decode(b'', True)
+    if string:
+        yield html_entities_unescape(string)
+
 def byte_string_to_xml(byte_string, input_encoding='utf-8', errors='replace',
         output_encoding='utf-8', attrib=False, control_chars='replace'):
     '''Make sure a byte :class:`bytes` is validly encoded for xml output
@@ -771,6 +1159,132 @@ def byte_string_to_xml(byte_string, input_encoding='utf-8', errors='replace',
     return unicode_to_xml(u_string, encoding=output_encoding,
             attrib=attrib, control_chars=control_chars)
 
+def _xml_escape(string, control_chars, attrib):
+    '''Handle :term:`control characters` and escape a :class:`str` for xml
+
+    :arg string: :class:`str` string to escape
+    :arg control_chars: ``replace``, ``ignore``, or ``strict``
+    :arg attrib: If :data:`True`, also escape ``"``
+    :raises KeyError: if :attr:`control_chars` isn't one of the valid values
+    :raises XmlEncodeError: if :attr:`control_chars` is ``strict`` and
+        :attr:`string` has :term:`control characters`
+    :returns: escaped :class:`str` string.  This is :attr:`string` itself if
+        nothing had to be changed.
+    '''
+    control_table, entities = _XML_ESCAPES[(control_chars, bool(attrib))]
+    # Control characters aren't printable.  Some characters that are allowed
+    # (like tab and newline) aren't either so those strings have to be
+    # searched.
+    if not string.isprintable() and \
+            _CONTROL_CHARS_RE.search(string) is not None:
+        if control_table is None:
+            raise XmlEncodeError('ASCII control code present in string'
+                    ' input')
+        string = string.translate(control_table)
+    for char, entity in entities:
+        if char in string:
+            string = string.replace(char, entity)
+    return string
+
+def write_xml(fileobj, chunks, encoding='utf-8', attrib=False,
+        control_chars='replace', input_encoding='utf-8', errors='replace'):
+    '''Write strings to a binary file, escaped and encoded for xml
+
+    :arg fileobj: Binary file object (anything with a ``write`` method that
+        takes byte :class:`bytes`) to write to
+    :arg chunks: :class:`str` string or byte :class:`bytes` to write or an
+        iterable of them.  For instance, the fields of an xml document or
+        a large text read in pieces.
+    :kwarg encoding: Encoding to write.  Default is :term:`UTF-8`.
+        Characters that aren't available in the encoding are written as xml
+        character references.
+    :kwarg attrib: If :data:`True`, quote the strings for use in an xml
+        attribute.  If :data:`False` (default), quote for use in an xml text
+        field.
+    :kwarg control_chars: What to do with :term:`control characters`.  Same
+        as for :func:`unicode_to_xml`.
+    :kwarg input_encoding: Encoding used to decode chunks that are byte
+        :class:`bytes`.  Default ``utf-8``.  A multibyte character may be
+        split between two byte chunks that follow each other.  If
+        a :class:`str` chunk comes between them, the pieces of the character
+        are each decoded on their own with :attr:`errors`.
+    :kwarg errors: How to handle byte chunks that can't be decoded with
+        :attr:`input_encoding`.  Same as for :func:`byte_string_to_xml`.
+    :raises XmlEncodeError: If :attr:`control_chars` is ``strict`` and
+        a chunk has :term:`control characters` or if a chunk is not
+        a :class:`str` string or byte :class:`bytes`.  Some of the chunks
+        before the one that had the problem may have been written.
+    :raises ValueError: If :attr:`control_chars` is set to something other
+        than ``replace``, ``ignore``, or ``strict``.
+    :returns: Number of bytes written
+
+    The output is the same as calling :func:`unicode_to_xml` (or
+    :func:`byte_string_to_xml`) on each chunk and writing the results except
+    that stateful encodings like ``utf-16`` only write their byte order mark
+    once and characters split between byte chunks are decoded whole.  The
+    text isn't copied for each step of the conversion, though.  The chunks are
+    collected into large pieces which are searched once for the characters
+    that need to be handled, escaped if necessary, encoded, and written so
+    it's efficient to pass many small fields::
+
+        with open('primary.xml', 'wb') as xml_file:
+            for package in packages:
+                xml_file.write(b'<summary>')
+                write_xml(xml_file, package.summary)
+                xml_file.write(b'</summary>\\n')
+
+    .. versionadded:: kitchen 1.2.7, API: kitchen.text 2.3.0
+    '''
+    if control_chars not in ('replace', 'ignore', 'strict'):
+        raise ValueError('The control_chars argument to write_xml'
+                ' must be one of ignore, replace, or strict')
+    if isunicodestring(chunks) or isbytestring(chunks):
+        chunks = (chunks,)
+
+    # Incremental so that stateful encodings only write their BOM once
+    encode = codecs.getincrementalencoder(encoding)('xmlcharrefreplace').encode
+    decoder = None
+    written = 0
+    # Escaping works character by character so the chunks can be joined and
+    # then escaped and encoded together.  That's much faster than handling
+    # each one when there are many small ones.
+    pending = []
+    pending_size = 0
+    for chunk in chunks:
+        if isbytestring(chunk):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(input_encoding)(errors)
+            chunk = decoder.decode(chunk)
+        elif isunicodestring(chunk):
+            if decoder is not None:
+                # Bytes left over from a truncated multibyte character have to
+                # be written before this chunk
+                leftover = decoder.decode(b'', True)
+                if leftover:
+                    pending.append(leftover)
+                    pending_size += len(leftover)
+        else:
+            raise XmlEncodeError('write_xml can only write unicode (str)'
+                    ' and byte strings')
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= _XML_WRITE_SIZE:
+            data = encode(_xml_escape(''.join(pending), control_chars,
+                attrib))
+            fileobj.write(data)
+            written += len(data)
+            pending = []
+            pending_size = 0
+
+    if decoder is not None:
+        # Bytes left over from a truncated multibyte character
+        pending.append(decoder.decode(b'', True))
+    data = encode(_xml_escape(''.join(pending), control_chars, attrib), True)
+    if data:
+        fileobj.write(data)
+        written += len(data)
+    return written
+
 def xml_to_byte_string(byte_string, input_encoding='utf-8', errors='replace',
         output_encoding='utf-8'):
     '''Transform a byte :class:`bytes` from an xml file into :class:`str`
@@ -883,6 +1397,89 @@ def guess_encoding_to_xml(string, output_encoding='utf-8', attrib=False,
             errors='replace', output_encoding=output_encoding,
             attrib=attrib, control_chars=control_chars)
 
+def guess_encoding_to_xml_many(strings, output_encoding='utf-8',
+        attrib=False, control_chars='replace'):
+    '''Convert many strings into byte :class:`bytes` suitable for xml
+
+    :arg strings: iterable of byte :class:`bytes` (usually mostly
+        :term:`UTF-8`) and :class:`str` strings to convert
+    :kwarg output_encoding: Output encoding for the byte :class:`bytes`.  This
+        should match the encoding of your xml file.
+    :kwarg attrib: If :data:`True`, escape the items for use in an xml
+        attribute.  If :data:`False` (default) escape the items for use in
+        a text node.
+    :kwarg control_chars: What to do with :term:`control characters`.  Same
+        as for :func:`unicode_to_xml`.
+    :raises ValueError: If :attr:`control_chars` is set to something other
+        than ``replace``, ``ignore``, or ``strict``.
+    :raises XmlEncodeError: From the iterator if :attr:`control_chars` is
+        ``strict`` and an item has :term:`control characters`.  Every item
+        before that one has already been yielded.
+    :returns: iterator that yields the result of :func:`guess_encoding_to_xml`
+        for each item of :attr:`strings` in turn
+
+    This replaces checking each byte :class:`bytes` with
+    :func:`~kitchen.text.misc.byte_string_valid_xml` and converting the ones
+    that fail with :func:`guess_encoding_to_xml`.  Byte :class:`bytes` are
+    decoded as :term:`UTF-8` once and the result is used to make the output.
+    When the output encoding is :term:`UTF-8` and nothing has to be escaped,
+    the byte :class:`bytes` are returned as they are.  The ones that aren't
+    :term:`UTF-8` are collected and have their encodings guessed together.
+
+    The strings are read in batches as the iterator is consumed so this
+    works on iterables of any size.  Each one is converted just before it is
+    yielded.
+
+    .. versionadded:: kitchen 1.2.7, API: kitchen.text 2.3.0
+    '''
+    if control_chars not in ('replace', 'ignore', 'strict'):
+        raise ValueError('The control_chars argument to'
+                ' guess_encoding_to_xml_many must be one of ignore, replace,'
+                ' or strict')
+    return _guess_encoding_to_xml_many(iter(strings),
+            _canonical_encoding(output_encoding), attrib, control_chars)
+
+def _guess_encoding_to_xml_many(strings, output_encoding, attrib,
+        control_chars):
+    '''Generator doing the work for :func:`guess_encoding_to_xml_many`'''
+    while True:
+        batch = list(itertools.islice(strings, _XML_MANY_BATCH_SIZE))
+        if not batch:
+            break
+
+        # Decode the whole batch first so that the encodings of the byte
+        # strings that aren't utf-8 can be guessed together.  The conversion
+        # is done item by item so an error only loses the item that had it.
+        decoded = []
+        not_utf8 = []
+        for string in batch:
+            u_string = None
+            if isinstance(string, bytes):
+                try:
+                    u_string = str(string, 'utf-8')
+                except UnicodeDecodeError:
+                    not_utf8.append(string)
+            decoded.append(u_string)
+        encodings = iter(_guess_encodings(not_utf8))
+
+        for string, u_string in zip(batch, decoded):
+            if u_string is not None:
+                escaped = _xml_escape(u_string, control_chars, attrib)
+                if escaped is u_string and output_encoding == 'utf-8':
+                    yield string
+                else:
+                    yield escaped.encode(output_encoding, 'xmlcharrefreplace')
+            elif isinstance(string, bytes):
+                yield byte_string_to_xml(string,
+                        input_encoding=next(encodings), errors='replace',
+                        output_encoding=output_encoding, attrib=attrib,
+                        control_chars=control_chars)
+            else:
+                # Unicode strings and anything unusual
+                yield guess_encoding_to_xml(string,
+                        output_encoding=output_encoding, attrib=attrib,
+                        control_chars=control_chars)
+
 def to_xml(string, encoding='utf-8', attrib=False, control_chars='ignore'):
     '''*Deprecated*: Use :func:`guess_encoding_to_xml` instead
     '''
@@ -894,7 +1491,10 @@ def to_xml(string, encoding='utf-8', attrib=False, control_chars='ignore'):
 
 __all__ = ('BYTE_EXCEPTION_CONVERTERS', 'EXCEPTION_CONVERTERS',
         'byte_string_to_xml', 'bytes_to_xml', 'exception_to_bytes',
-        'exception_to_unicode', 'getwriter', 'guess_encoding_to_xml',
-        'to_bytes', 'to_str', 'to_unicode', 'to_utf8', 'to_xml',
-        'unicode_to_xml', 'xml_to_byte_string', 'xml_to_bytes',
+        'exception_to_unicode', 'getreader', 'getwriter',
+        'guess_encoding_to_xml', 'guess_encoding_to_xml_many',
+        'iter_xml_to_unicode',
+        'to_bytes', 'to_bytes_many', 'to_str', 'to_unicode',
+        'to_unicode_many', 'to_utf8', 'to_xml',
+        'unicode_to_xml', 'write_xml', 'xml_to_byte_string', 'xml_to_bytes',
         'xml_to_unicode')
@@ -33,13 +33,19 @@ Collection of text functions that don't fit in another category.
     :func:`~kitchen.text.misc.isbytestring`, and
     :func:`~kitchen.text.misc.isunicodestring` to help tell which string type
     is which on python2 and python3
+
+.. versionchanged:: kitchen 1.2.7, API: kitchen.text 2.3.0
+    Added :func:`~kitchen.text.misc.invalid_xml_byte_strings` and
+    :func:`~kitchen.text.misc.invalid_encoding_byte_strings`
 '''
+import codecs
 import html.entities
 import itertools
 import re
 
 try:
     import chardet
+    import chardet.universaldetector
 except ImportError:
     chardet = None
 
@@ -55,9 +61,50 @@ _CONTROL_CODES = frozenset(itertools.chain(range(0, 8), (11, 12), range(14, 32),
 _CONTROL_CHARS = frozenset(map(chr, _CONTROL_CODES))
 _IGNORE_TABLE = dict(zip(_CONTROL_CODES, [None] * len(_CONTROL_CODES)))
 _REPLACE_TABLE = dict(zip(_CONTROL_CODES, ['?'] * len(_CONTROL_CODES)))
-
-# _ENTITY_RE
-_ENTITY_RE = re.compile(r'(?s)<[^>]*>|&#?\w+;')
+# Control characters aren't allowed in xml.  Searching for them is slower than
+# str.isprintable() so this is only used on strings that aren't printable.
+_CONTROL_CHARS_RE = re.compile('[%s]' % ''.join(re.escape(chr(code))
+    for code in sorted(_CONTROL_CODES)))
+
+# Control characters in byte strings.  For the encodings that these are used
+# for, checking the bytes saves decoding them.  Deleting them with
+# bytes.translate() and comparing the length is several times faster than
+# searching with a regex.
+_ASCII_CONTROL_BYTES = bytes(code for code in _CONTROL_CODES if code < 128)
+_LATIN1_CONTROL_BYTES = bytes(sorted(_CONTROL_CODES))
+# U+0080 to U+009F are encoded as \xc2\x80 to \xc2\x9f in utf-8
+_UTF8_C1_BYTES_RE = re.compile(b'\xc2[\x80-\x9f]')
+
+# Byte strings in these encodings can be joined with spaces and checked all
+# at once.  A string that's valid alone is still valid next to a space and
+# one that's invalid can't be made valid by one.
+_JOINABLE_ENCODINGS = frozenset(('utf-8', 'iso8859-1', 'ascii'))
+# Number of byte strings that are checked together
+_VALIDATE_GROUP_SIZE = 128
+
+# (function that checks one byte string, whether the encoding is joinable) for
+# each encoding.  Created when they're first needed by _xml_validator() and
+# _encoding_validator()
+_xml_validators = {}
+_encoding_validators = {}
+
+# Splits a string into text and the tags and entities that
+# html_entities_unescape() replaces
+_ENTITY_SPLIT_RE = re.compile(r'(?s)(<[^>]*>|&#?\w+;)')
+
+# What html_entities_unescape() replaces each entity with.  This starts with
+# the named entities.  Numeric character references up to _CHARREF_MAX_SIZE
+# long ('&#x10FFFF;') are added the first time that they're seen until there
+# are _ENTITY_CACHE_SIZE entries.  Tags and anything else can be any length so
+# they aren't kept.
+_ENTITY_CACHE_SIZE = 4096
+_CHARREF_MAX_SIZE = 10
+_ENTITIES = {}
+for _name, _value in html.entities.entitydefs.items():
+    if _value[:2] == '&#':
+        _value = chr(int(_value[2:-1]))
+    _ENTITIES['&%s;' % _name] = _value
+del _name, _value
 
 def isbasestring(obj):
     '''Determine if obj is a byte :class:`bytes` or :class:`str` string
@@ -148,6 +195,34 @@ def guess_encoding(byte_string, disable_chardet=False):
 
     return input_encoding
 
+def _guess_encodings(byte_strings):
+    '''Guess the encodings of byte strings that aren't :term:`UTF-8`
+
+    :arg byte_strings: Sequence of byte :class:`bytes` that failed to decode
+        as :term:`UTF-8`
+    :returns: :class:`list` of what :func:`guess_encoding` returns for each of
+        them
+
+    :func:`chardet.detect` sets up a new detector each time that it's called.
+    This resets and reuses one detector for all of the byte strings.
+    '''
+    if not chardet:
+        return ['latin-1'] * len(byte_strings)
+
+    detector = chardet.universaldetector.UniversalDetector()
+    encodings = []
+    for byte_string in byte_strings:
+        detector.reset()
+        detector.feed(byte_string)
+        detector.close()
+        detection_info = detector.result
+        if detection_info['encoding'] and \
+                detection_info['confidence'] >= _CHARDET_THRESHHOLD:
+            encodings.append(detection_info['encoding'])
+        else:
+            encodings.append('latin-1')
+    return encodings
+
 def str_eq(str1, str2, encoding='utf-8', errors='replace'):
     '''Compare two strings, converting to byte :class:`bytes` if one is
     :class:`str`
@@ -255,6 +330,23 @@ def process_control_chars(string, strategy='replace'):
 # http://effbot.org/zone/re-sub.htm#unescape-html
 # http://effbot.org/zone/copyright.htm
 #
+def _unescape_entity(string):
+    '''Return what :func:`html_entities_unescape` replaces a tag or an entity
+    that isn't in :data:`_ENTITIES` with'''
+    if string[:1] == "<":
+        return "" # ignore tags
+    if string[:2] == "&#":
+        try:
+            if string[:3] == "&#x":
+                return chr(int(string[3:-1], 16))
+            else:
+                return chr(int(string[2:-1]))
+        except ValueError:
+            # If the value is outside the unicode codepoint range, leave
+            # it in the output as is
+            pass
+    return string # leave as is
+
 def html_entities_unescape(string):
     '''Substitute unicode characters for HTML entities
 
@@ -263,39 +355,155 @@ def html_entities_unescape(string):
         given
     :rtype: :class:`str` string
     :returns: The plain text without html entities
-    '''
-    def fixup(match):
-        string = match.group(0)
-        if string[:1] == "<":
-            return "" # ignore tags
-        if string[:2] == "&#":
-            try:
-                if string[:3] == "&#x":
-                    return chr(int(string[3:-1], 16))
-                else:
-                    return chr(int(string[2:-1]))
-            except ValueError:
-                # If the value is outside the unicode codepoint range, leave
-                # it in the output as is
-                pass
-        elif string[:1] == "&":
-            entity = html.entities.entitydefs.get(string[1:-1])
-            if entity:
-                if entity[:2] == "&#":
-                    try:
-                        return chr(int(entity[2:-1]))
-                    except ValueError:
-                        # If the value is outside the unicode codepoint range,
-                        # leave it in the output as is
-                        pass
-                else:
-                    return entity
-        return string # leave as is
 
+    .. versionchanged:: kitchen 1.2.7, API: kitchen.text 2.3.0
+        Return strings without ``&`` or ``<`` right away and look the entities
+        up in a table instead of calling a function for each one.
+    '''
     if not isunicodestring(string):
         raise TypeError('html_entities_unescape must have a unicode type (str)'
                 ' for its first argument')
-    return re.sub(_ENTITY_RE, fixup, string)
+    if '&' not in string and '<' not in string:
+        return string
+
+    # Odd items are the tags and entities.  Looking them all up at once is
+    # much faster than having re.sub() call a function for each one.
+    pieces = _ENTITY_SPLIT_RE.split(string)
+    entities = pieces[1::2]
+    replacements = list(map(_ENTITIES.get, entities))
+    if None in replacements:
+        for index, replacement in enumerate(replacements):
+            if replacement is None:
+                entity = entities[index]
+                if entity[:1] == '<':
+                    # Tags are removed
+                    replacements[index] = ''
+                    continue
+                replacement = _unescape_entity(entity)
+                replacements[index] = replacement
+                if entity[:2] == '&#' and len(entity) <= _CHARREF_MAX_SIZE \
+                        and len(_ENTITIES) < _ENTITY_CACHE_SIZE:
+                    _ENTITIES[entity] = replacement
+    pieces[1::2] = replacements
+    return ''.join(pieces)
+
+def _encoding_validator(encoding):
+    '''Return a function that checks byte strings like
+    :func:`byte_string_valid_encoding` does for :attr:`encoding` and whether
+    the byte strings can be joined to check them together'''
+    try:
+        return _encoding_validators[encoding]
+    except KeyError:
+        pass
+
+    name = codecs.lookup(encoding).name
+    if name == 'iso8859-1':
+        # Every byte is a valid latin-1 character
+        def validator(byte_string):
+            if not isinstance(byte_string, (bytes, bytearray)):
+                # Raise the same TypeError that decoding it would
+                str(byte_string, encoding)
+            return True
+    else:
+        ascii_compatible = name in _JOINABLE_ENCODINGS
+        def validator(byte_string):
+            # bytes.isascii() is much faster than decoding
+            if ascii_compatible and isinstance(byte_string,
+                    (bytes, bytearray)) and byte_string.isascii():
+                return True
+            try:
+                str(byte_string, encoding)
+            except UnicodeError:
+                # Not encoded with the xml file's encoding
+                return False
+            return True
+    return _encoding_validators.setdefault(encoding,
+            (validator, name in _JOINABLE_ENCODINGS))
+
+def _xml_validator(encoding):
+    '''Return a function that checks byte strings like
+    :func:`byte_string_valid_xml` does for :attr:`encoding` and whether the
+    byte strings can be joined to check them together'''
+    try:
+        return _xml_validators[encoding]
+    except KeyError:
+        pass
+
+    name = codecs.lookup(encoding).name
+    if name == 'utf-8':
+        def validator(byte_string):
+            if not isinstance(byte_string, (bytes, bytearray)):
+                return False
+            if not byte_string.isascii():
+                try:
+                    str(byte_string, 'utf-8')
+                except UnicodeError:
+                    return False
+                if b'\xc2' in byte_string and \
+                        _UTF8_C1_BYTES_RE.search(byte_string):
+                    return False
+            return len(byte_string.translate(None, _ASCII_CONTROL_BYTES)) \
+                    == len(byte_string)
+    elif name == 'iso8859-1':
+        def validator(byte_string):
+            if not isinstance(byte_string, (bytes, bytearray)):
+                return False
+            return len(byte_string.translate(None, _LATIN1_CONTROL_BYTES)) \
+                    == len(byte_string)
+    elif name == 'ascii':
+        def validator(byte_string):
+            if not isinstance(byte_string, (bytes, bytearray)) or \
+                    not byte_string.isascii():
+                return False
+            return len(byte_string.translate(None, _ASCII_CONTROL_BYTES)) \
+                    == len(byte_string)
+    else:
+        def validator(byte_string):
+            if not isbytestring(byte_string):
+                return False
+            try:
+                u_string = str(byte_string, encoding)
+            except UnicodeError:
+                return False
+            return _CONTROL_CHARS_RE.search(u_string) is None
+    return _xml_validators.setdefault(encoding,
+            (validator, name in _JOINABLE_ENCODINGS))
+
+def _invalid_byte_strings(byte_strings, validator, joinable):
+    '''Return the indexes of the byte strings that validator rejects
+
+    When the encoding is joinable, groups of byte strings are joined and
+    checked together.  Groups that fail are split in half and checked again
+    until the invalid strings are found.
+    '''
+    if not joinable:
+        return [index for index, byte_string in enumerate(byte_strings)
+                if not validator(byte_string)]
+
+    if not isinstance(byte_strings, (list, tuple)):
+        byte_strings = list(byte_strings)
+    invalid = []
+    # Ranges of indexes to check.  When a range has a problem, its halves
+    # are checked until the invalid byte strings are found.
+    ranges = [(start, min(start + _VALIDATE_GROUP_SIZE, len(byte_strings)))
+            for start in range(0, len(byte_strings), _VALIDATE_GROUP_SIZE)]
+    ranges.reverse()
+    while ranges:
+        start, end = ranges.pop()
+        if end - start == 1:
+            if not validator(byte_strings[start]):
+                invalid.append(start)
+            continue
+        try:
+            if validator(b' '.join(byte_strings[start:end])):
+                continue
+        except TypeError:
+            # Something in the range isn't a byte string
+            pass
+        middle = (start + end) // 2
+        ranges.append((middle, end))
+        ranges.append((start, middle))
+    return invalid
 
 def byte_string_valid_xml(byte_string, encoding='utf-8'):
     '''Check that a byte :class:`bytes` would be valid in xml
@@ -318,24 +526,13 @@ def byte_string_valid_xml(byte_string, encoding='utf-8'):
             else:
                 processed_array.append(guess_bytes_to_xml(string, encoding='utf-8'))
         output_xml(processed_array)
-    '''
-    if not isbytestring(byte_string):
-        # Not a byte string
-        return False
-
-    try:
-        u_string = str(byte_string, encoding)
-    except UnicodeError:
-        # Not encoded with the xml file's encoding
-        return False
 
-    data = frozenset(u_string)
-    if data.intersection(_CONTROL_CHARS):
-        # Contains control codes
-        return False
+    .. seealso::
 
-    # The byte string is compatible with this xml file
-    return True
+        :func:`invalid_xml_byte_strings`
+            to check many byte strings at once
+    '''
+    return _xml_validator(encoding)[0](byte_string)
 
 def byte_string_valid_encoding(byte_string, encoding='utf-8'):
     '''Detect if a byte :class:`bytes` is valid in a specific encoding
@@ -353,16 +550,61 @@ def byte_string_valid_encoding(byte_string, encoding='utf-8'):
         :class:`bytes` actually was encoded in that encoding.  If you want that
         sort of functionality, you probably want to use
         :func:`~kitchen.text.misc.guess_encoding` instead.
+
+    .. seealso::
+
+        :func:`invalid_encoding_byte_strings`
+            to check many byte strings at once
     '''
-    try:
-        str(byte_string, encoding)
-    except UnicodeError:
-        # Not encoded with the xml file's encoding
-        return False
+    return _encoding_validator(encoding)[0](byte_string)
+
+def invalid_xml_byte_strings(byte_strings, encoding='utf-8'):
+    '''Find the byte :class:`bytes` that would not be valid in xml
+
+    :arg byte_strings: Iterable of byte :class:`bytes` to check
+    :kwarg encoding: Encoding of the xml file.  Default: :term:`UTF-8`
+    :returns: :class:`list` of the indexes of the items in
+        :attr:`byte_strings` that :func:`byte_string_valid_xml` would return
+        :data:`False` for.  It's empty if all of them are valid.
+
+    This is faster than calling :func:`byte_string_valid_xml` on each byte
+    :class:`bytes`.  For :term:`UTF-8`, ``latin-1``, and :term:`ASCII`, the
+    byte :class:`bytes` are checked in groups and only groups that have
+    a problem are narrowed down further.  Byte :class:`bytes` that are
+    :term:`ASCII` aren't decoded and :term:`control characters` are searched
+    for without decoding.  Example::
+
+        invalid = invalid_xml_byte_strings(ARRAY_OF_MOSTLY_UTF8_STRINGS)
+        for index in invalid:
+            ARRAY_OF_MOSTLY_UTF8_STRINGS[index] = guess_encoding_to_xml(
+                    ARRAY_OF_MOSTLY_UTF8_STRINGS[index])
+
+    .. versionadded:: kitchen 1.2.7, API: kitchen.text 2.3.0
+    '''
+    return _invalid_byte_strings(byte_strings, *_xml_validator(encoding))
+
+def invalid_encoding_byte_strings(byte_strings, encoding='utf-8'):
+    '''Find the byte :class:`bytes` that are not valid in an encoding
 
-    # byte string is valid in this encoding
-    return True
+    :arg byte_strings: Iterable of byte :class:`bytes` to check
+    :kwarg encoding: encoding to test against.  Defaults to :term:`UTF-8`.
+    :returns: :class:`list` of the indexes of the items in
+        :attr:`byte_strings` that :func:`byte_string_valid_encoding` would
+        return :data:`False` for.  It's empty if all of them are valid.
+
+    This is faster than calling :func:`byte_string_valid_encoding` on each
+    byte :class:`bytes`.  For :term:`UTF-8` and :term:`ASCII`, the byte
+    :class:`bytes` are checked in groups and only groups that have a problem
+    are narrowed down further.  Byte :class:`bytes` that are :term:`ASCII`
+    aren't decoded.
+
+    .. versionadded:: kitchen 1.2.7, API: kitchen.text 2.3.0
+    '''
+    return _invalid_byte_strings(byte_strings,
+            *_encoding_validator(encoding))
 
 __all__ = ('byte_string_valid_encoding', 'byte_string_valid_xml',
-        'guess_encoding', 'html_entities_unescape', 'isbasestring',
-        'isbytestring', 'isunicodestring', 'process_control_chars', 'str_eq')
+        'guess_encoding', 'html_entities_unescape',
+        'invalid_encoding_byte_strings', 'invalid_xml_byte_strings',
+        'isbasestring', 'isbytestring', 'isunicodestring',
+        'process_control_chars', 'str_eq')
@@ -105,6 +105,46 @@ class TestConverters(unittest.TestCase, base_classes.UnicodeTestData):
         self.assertRaises(UnicodeEncodeError, converters.to_bytes,
             *[self.u_mixed], **{'errors': 'strict', 'encoding': 'latin1'})
 
+    def test_to_unicode_many(self):
+        '''Test that to_unicode_many converts each item just like to_unicode'''
+        objs = [self.u_japanese, self.utf8_spanish, bytearray(self.utf8_japanese),
+                self.latin1_spanish, 5, None, StrReturnsUnicode(), ReprUnicode()]
+        for nonstring in (None, 'empty', 'passthru', 'simplerepr', 'repr'):
+            for encoding in ('utf-8', 'utf8', 'latin1', 'euc_jp'):
+                self.assertEqual(list(converters.to_unicode_many(objs,
+                    encoding=encoding, nonstring=nonstring)),
+                    [converters.to_unicode(obj, encoding=encoding,
+                        nonstring=nonstring) for obj in objs])
+        self.assertEqual(list(converters.to_unicode_many(
+            [self.latin1_spanish], errors='ignore')), [self.u_spanish_ignore])
+        self.assertRaises(UnicodeDecodeError, list, converters.to_unicode_many(
+            [self.latin1_spanish], errors='strict'))
+        self.assertRaises(TypeError, list, converters.to_unicode_many(
+            [self.u_spanish, 5], nonstring='strict'))
+        self.assertRaises(TypeError, list, converters.to_unicode_many(
+            [5], nonstring='foo'))
+        # Bad values only matter if a nonstring is actually reached
+        self.assertEqual(list(converters.to_unicode_many([self.u_spanish],
+            nonstring='foo')), [self.u_spanish])
+
+    def test_to_bytes_many(self):
+        '''Test that to_bytes_many converts each item just like to_bytes'''
+        objs = [self.u_japanese, self.u_spanish, self.utf8_japanese,
+                bytearray(self.latin1_spanish), 5, None, StrReturnsUnicode(),
+                ReprUnicode()]
+        for nonstring in (None, 'empty', 'passthru', 'simplerepr', 'repr'):
+            for encoding in ('utf-8', 'utf8', 'latin1', 'euc_jp'):
+                self.assertEqual(list(converters.to_bytes_many(objs,
+                    encoding=encoding, nonstring=nonstring)),
+                    [converters.to_bytes(obj, encoding=encoding,
+                        nonstring=nonstring) for obj in objs])
+        self.assertEqual(list(converters.to_bytes_many([self.u_mixed],
+            encoding='latin', errors='ignore')), [self.latin1_mixed_ignore])
+        self.assertRaises(UnicodeEncodeError, list, converters.to_bytes_many(
+            [self.u_mixed], encoding='latin1', errors='strict'))
+        self.assertRaises(TypeError, list, converters.to_bytes_many(
+            [self.utf8_spanish, 5], nonstring='strict'))
+
     def _check_repr_bytes(self, repr_string, obj_name):
         self.assertTrue(isinstance(repr_string, bytes))
         match = self.repr_re.match(repr_string)
@@ -158,6 +198,7 @@ class TestConverters(unittest.TestCase, base_classes.UnicodeTestData):
         self.assertEqual(converters.unicode_to_xml(None), b'')
         self.assertRaises(XmlEncodeError, converters.unicode_to_xml, *[b'byte string'])
         self.assertRaises(ValueError, converters.unicode_to_xml, *['string'], **{'control_chars': 'foo'})
+        self.assertRaises(ValueError, converters.unicode_to_xml, *['string'], **{'control_chars': ['replace']})
         self.assertRaises(XmlEncodeError, converters.unicode_to_xml,
                 *['string\u0002'], **{'control_chars': 'strict'})
         self.assertEqual(converters.unicode_to_xml(self.u_entity), self.utf8_entity_escape)
@@ -165,12 +206,41 @@ class TestConverters(unittest.TestCase, base_classes.UnicodeTestData):
         self.assertEqual(converters.unicode_to_xml(self.u_entity, encoding='ascii'), self.ascii_entity_escape)
         self.assertEqual(converters.unicode_to_xml(self.u_entity, encoding='ascii', attrib=True), self.ascii_attrib_escape)
 
+    def test_unicode_to_xml_control_chars(self):
+        string = 'a\x00<b>\x1f"\x85'
+        self.assertEqual(converters.unicode_to_xml(string),
+                b'a?&lt;b&gt;?"?')
+        self.assertEqual(converters.unicode_to_xml(string, attrib=True,
+            control_chars='ignore'), b'a&lt;b&gt;&quot;')
+        self.assertRaises(XmlEncodeError, converters.unicode_to_xml, string,
+                control_chars='strict')
+        self.assertEqual(converters.unicode_to_xml('<"a">', attrib=1,
+            control_chars='strict'), b'&lt;&quot;a&quot;&gt;')
+        # Strings without anything to escape are only encoded
+        self.assertEqual(converters.unicode_to_xml(self.u_japanese,
+            control_chars='strict'), self.utf8_japanese)
+
     def test_xml_to_unicode(self):
         self.assertEqual(converters.xml_to_unicode(self.utf8_entity_escape, 'utf8', 'replace'), self.u_entity)
         self.assertEqual(converters.xml_to_unicode(self.utf8_attrib_escape, 'utf8', 'replace'), self.u_entity)
         self.assertEqual(converters.xml_to_unicode(self.ascii_entity_escape, 'ascii', 'replace'), self.u_entity)
         self.assertEqual(converters.xml_to_unicode(self.ascii_attrib_escape, 'ascii', 'replace'), self.u_entity)
 
+    def test_iter_xml_to_unicode(self):
+        document = ('<p a="&quot;">' + self.u_entity_escape + '&#x263a;'
+                ' &unknown; & < b > ' + self.u_japanese + '</p>\n'
+                ) * 5 + '&amp'
+        expected = converters.xml_to_unicode(document.encode('utf-8'))
+        byte_document = document.encode('utf-8')
+        for size in (1, 2, 3, 7, 64, len(byte_document)):
+            chunks = [byte_document[i:i + size]
+                    for i in range(0, len(byte_document), size)]
+            self.assertEqual(''.join(converters.iter_xml_to_unicode(chunks)),
+                    expected)
+        self.assertEqual(''.join(converters.iter_xml_to_unicode(
+            ['&l', 't;', '<b', '>'])), '<')
+        self.assertEqual(list(converters.iter_xml_to_unicode([])), [])
+
     def test_xml_to_byte_string(self):
         self.assertEqual(converters.xml_to_byte_string(self.utf8_entity_escape, 'utf8', 'replace'), self.u_entity.encode('utf8'))
         self.assertEqual(converters.xml_to_byte_string(self.utf8_attrib_escape, 'utf8', 'replace'), self.u_entity.encode('utf8'))
@@ -195,6 +265,64 @@ class TestConverters(unittest.TestCase, base_classes.UnicodeTestData):
         self.assertEqual(converters.byte_string_to_xml(self.utf8_entity), self.utf8_entity_escape)
         self.assertEqual(converters.byte_string_to_xml(self.utf8_entity, attrib=True), self.utf8_attrib_escape)
 
+    def test_write_xml(self):
+        for attrib in (False, True):
+            for encoding in ('utf-8', 'ascii'):
+                for control_chars in ('replace', 'ignore'):
+                    chunks = [self.u_entity, '', 'a\x00b\x1f', '"plain"',
+                            self.u_entity]
+                    fileobj = io.BytesIO()
+                    written = converters.write_xml(fileobj, chunks,
+                            encoding=encoding, attrib=attrib,
+                            control_chars=control_chars)
+                    expected = b''.join(converters.unicode_to_xml(chunk,
+                        encoding=encoding, attrib=attrib,
+                        control_chars=control_chars) for chunk in chunks)
+                    self.assertEqual(fileobj.getvalue(), expected)
+                    self.assertEqual(written, len(expected))
+
+        # A single string and byte strings split inside of a character
+        fileobj = io.BytesIO()
+        converters.write_xml(fileobj, self.u_entity)
+        self.assertEqual(fileobj.getvalue(), self.utf8_entity_escape)
+        fileobj = io.BytesIO()
+        converters.write_xml(fileobj, [self.utf8_entity[:-1],
+            self.utf8_entity[-1:]], attrib=True)
+        self.assertEqual(fileobj.getvalue(), self.utf8_attrib_escape)
+        fileobj = io.BytesIO()
+        converters.write_xml(fileobj, [self.utf8_entity[:-1]])
+        self.assertEqual(fileobj.getvalue(),
+                self.utf8_entity_escape[:-2] + '\ufffd'.encode('utf-8'))
+        # Unless a str chunk is written between the pieces
+        fileobj = io.BytesIO()
+        converters.write_xml(fileobj, [b'\xc3', 'x', b'\xa9'])
+        self.assertEqual(fileobj.getvalue(), '\ufffdx\ufffd'.encode('utf-8'))
+        # bytearray is a byte string too
+        fileobj = io.BytesIO()
+        converters.write_xml(fileobj, [bytearray(self.utf8_entity)])
+        self.assertEqual(fileobj.getvalue(), self.utf8_entity_escape)
+        fileobj = io.BytesIO()
+        converters.write_xml(fileobj, bytearray(self.utf8_entity))
+        self.assertEqual(fileobj.getvalue(), self.utf8_entity_escape)
+
+        # Stateful encodings only write their BOM once
+        fileobj = io.BytesIO()
+        converters.write_xml(fileobj, ['a', 'b'], encoding='utf-16')
+        self.assertEqual(fileobj.getvalue(), 'ab'.encode('utf-16'))
+
+        # Large output is written in pieces
+        fileobj = io.BytesIO()
+        converters.write_xml(fileobj, (self.u_entity for i in range(10000)))
+        self.assertEqual(fileobj.getvalue(), self.utf8_entity_escape * 10000)
+
+        fileobj = io.BytesIO()
+        self.assertRaises(XmlEncodeError, converters.write_xml, fileobj,
+                ['a', 'b\x00'], control_chars='strict')
+        self.assertEqual(fileobj.getvalue(), b'')
+        self.assertRaises(XmlEncodeError, converters.write_xml, fileobj, [1])
+        self.assertRaises(ValueError, converters.write_xml, fileobj, ['a'],
+                control_chars='foo')
+
     def test_bytes_to_xml(self):
         self.assertEqual(converters.bytes_to_xml(self.b_byte_chars), self.b_byte_encoded)
 
@@ -207,6 +335,33 @@ class TestConverters(unittest.TestCase, base_classes.UnicodeTestData):
         self.assertEqual(converters.guess_encoding_to_xml(self.latin1_spanish), self.utf8_spanish)
         self.assertEqual(converters.guess_encoding_to_xml(self.utf8_japanese), self.utf8_japanese)
 
+    def test_guess_encoding_to_xml_many(self):
+        strings = [self.utf8_entity, self.u_entity, self.utf8_spanish,
+                self.latin1_spanish, self.utf8_japanese, b'', b'a\x00b',
+                bytearray(self.utf8_spanish), b'"quoted"'] * 300
+        for kwargs in ({}, {'attrib': True}, {'output_encoding': 'latin-1'},
+                {'control_chars': 'ignore'}):
+            results = list(converters.guess_encoding_to_xml_many(strings,
+                **kwargs))
+            self.assertEqual(results, [converters.guess_encoding_to_xml(
+                string, **kwargs) for string in strings])
+        # Valid utf-8 that doesn't need escaping is returned as it is
+        self.assertTrue(next(converters.guess_encoding_to_xml_many(
+            [self.utf8_spanish])) is self.utf8_spanish)
+        self.assertRaises(XmlEncodeError, list,
+                converters.guess_encoding_to_xml_many([b'a\x00b'],
+                    control_chars='strict'))
+        # The items before one with an error are still returned
+        results = converters.guess_encoding_to_xml_many([b'a', self.u_entity,
+            b'b\x00', b'c'], control_chars='strict')
+        self.assertEqual(next(results), b'a')
+        self.assertEqual(next(results), self.utf8_entity_escape)
+        self.assertRaises(XmlEncodeError, next, results)
+        self.assertRaises(ValueError, converters.guess_encoding_to_xml_many,
+                [b'a'], control_chars='foo')
+        self.assertRaises(TypeError, list,
+                converters.guess_encoding_to_xml_many([5]))
+
     def test_guess_encoding_to_xml_euc_japanese(self):
         if chardet:
             self.assertEqual(converters.guess_encoding_to_xml(self.euc_jp_japanese),
@@ -214,6 +369,16 @@ class TestConverters(unittest.TestCase, base_classes.UnicodeTestData):
         else:
             self.skipTest('chardet not installed, euc_japanese won\'t be detected')
 
+    def test_guess_encoding_to_xml_many_euc_japanese(self):
+        if chardet:
+            strings = [self.euc_jp_japanese, self.latin1_spanish,
+                    self.utf8_japanese] * 10
+            self.assertEqual(list(converters.guess_encoding_to_xml_many(
+                strings)), [converters.guess_encoding_to_xml(string)
+                    for string in strings])
+        else:
+            self.skipTest('chardet not installed, encodings won\'t be guessed')
+
     def test_guess_encoding_to_xml_euc_japanese_mangled(self):
         if chardet:
             self.skipTest('chardet installed, euc_japanese won\'t be mangled')
@@ -225,6 +390,16 @@ class TestGetWriter(unittest.TestCase, base_classes.UnicodeTestData):
     def setUp(self):
         self.io = io.BytesIO()
 
+    def test_encoding_name(self):
+        '''The stream keeps the encoding name that it was given'''
+        stream = converters.getwriter('UTF8')(self.io)
+        self.assertEqual(stream.encoding, 'UTF8')
+        stream.write(self.u_japanese)
+        self.assertEqual(self.io.getvalue(), self.utf8_japanese)
+        stream = converters.getreader('UTF8')(io.BytesIO(self.utf8_japanese))
+        self.assertEqual(stream.encoding, 'UTF8')
+        self.assertEqual(stream.read(), self.u_japanese)
+
     def test_utf8_writer(self):
         writer = converters.getwriter('utf-8')
         io = writer(self.io)
@@ -253,6 +428,115 @@ class TestGetWriter(unittest.TestCase, base_classes.UnicodeTestData):
         io = writer(self.io, errors='strict')
         self.assertRaises(UnicodeEncodeError, io.write, self.u_japanese)
 
+    def test_stateful_encoding(self):
+        writer = converters.getwriter('utf-16')
+        io = writer(self.io)
+        io.write(self.u_spanish)
+        io.write(self.u_japanese)
+        self.assertEqual(self.io.getvalue(),
+                (self.u_spanish + self.u_japanese).encode('utf-16'))
+
+    def test_buffered_writer(self):
+        writer = converters.getwriter('utf-8')
+        stream = writer(self.io, buffer_size=256)
+        stream.write(self.u_japanese)
+        stream.write(self.utf8_spanish)
+        self.assertEqual(self.io.getvalue(), b'')
+        # A newline writes out the buffer
+        stream.write('\n')
+        self.assertEqual(self.io.getvalue(),
+                self.utf8_japanese + self.utf8_spanish + b'\n')
+
+        self.io.seek(0)
+        self.io.truncate(0)
+        stream = writer(self.io, buffer_size=256, line_buffering=False)
+        stream.write(self.u_spanish + '\n')
+        self.assertEqual(self.io.getvalue(), b'')
+        stream.flush()
+        self.assertEqual(self.io.getvalue(), self.utf8_spanish + b'\n')
+
+    def test_buffered_output_unchanged(self):
+        '''Buffering does not change the bytes that are written'''
+        pieces = (self.u_japanese, '\n', self.euc_jp_japanese, 5,
+                self.u_spanish * 10, '\n', self.u_mixed, '\n')
+        for encoding in ('utf-8', 'latin-1', 'utf-16'):
+            writer = converters.getwriter(encoding)
+            unbuffered = io.BytesIO()
+            stream = writer(unbuffered)
+            for piece in pieces:
+                stream.write(piece)
+            for buffer_size in (1, 16, 4096):
+                for line_buffering in (True, False):
+                    buffered = io.BytesIO()
+                    stream = writer(buffered, buffer_size=buffer_size,
+                            line_buffering=line_buffering)
+                    for piece in pieces:
+                        stream.write(piece)
+                    stream.flush()
+                    self.assertEqual(buffered.getvalue(), unbuffered.getvalue())
+
+
+class TestGetReader(unittest.TestCase, base_classes.UnicodeTestData):
+    def test_utf8_reader(self):
+        reader = converters.getreader('utf-8')
+        stream = reader(io.BytesIO(self.utf8_japanese + b'\n' + self.utf8_spanish))
+        self.assertEqual(stream.readline(), self.u_japanese + '\n')
+        self.assertEqual(stream.read(), self.u_spanish)
+        self.assertEqual(stream.read(), '')
+
+    def test_split_characters(self):
+        '''Characters split between reads are decoded whole'''
+        reader = converters.getreader('utf-8')
+        stream = reader(io.BytesIO(self.utf8_japanese))
+        chunks = []
+        chunk = stream.read(1)
+        while chunk:
+            chunks.append(chunk)
+            chunk = stream.read(1)
+        self.assertEqual(''.join(chunks), self.u_japanese)
+
+    def test_byte_order_mark(self):
+        '''The byte order read from a BOM is kept between reads'''
+        text = self.u_japanese + '\n' + self.u_spanish + '\n'
+        for encoding in ('utf-16', 'utf-32'):
+            reader = converters.getreader(encoding)
+            stream = reader(io.BytesIO(text.encode(encoding)))
+            chunks = []
+            chunk = stream.read(3)
+            while chunk:
+                chunks.append(chunk)
+                chunk = stream.read(3)
+            self.assertEqual(''.join(chunks), text)
+
+            stream = reader(io.BytesIO(text.encode(encoding)))
+            self.assertEqual(stream.readline(), self.u_japanese + '\n')
+            self.assertEqual(stream.readline(), self.u_spanish + '\n')
+            self.assertEqual(stream.readline(), '')
+
+            stream = reader(io.BytesIO(text.encode(encoding)))
+            self.assertEqual(list(stream), [self.u_japanese + '\n',
+                self.u_spanish + '\n'])
+
+    def test_truncated_stream(self):
+        reader = converters.getreader('utf-8')
+        # Chop the last byte of a multibyte character
+        stream = reader(io.BytesIO(self.u_japanese[:3].encode('utf-8')[:-1]))
+        self.assertEqual(stream.read(), self.u_japanese[:2] + '\ufffd')
+        self.assertEqual(stream.read(), '')
+
+    def test_error_handlers(self):
+        '''Test setting alternate error handlers'''
+        reader = converters.getreader('utf-8')
+        stream = reader(io.BytesIO(self.latin1_spanish))
+        self.assertEqual(stream.read(), self.u_mangled_spanish_latin1_as_utf8)
+
+        stream = reader(io.BytesIO(self.latin1_spanish), errors='strict')
+        self.assertRaises(UnicodeDecodeError, stream.read)
+
+        stream = reader(io.BytesIO(self.u_japanese[:3].encode('utf-8')[:-1]),
+                errors='strict')
+        self.assertRaises(UnicodeDecodeError, stream.read)
+
 
 class TestExceptionConverters(unittest.TestCase, base_classes.UnicodeTestData):
     def setUp(self):
@@ -416,3 +700,9 @@ class TestDeprecatedConverters(TestConverters):
         obj_repr = converters.to_bytes(object, non_string='simplerepr')
         self.assertEqual(obj_repr, b"<class 'object'>")
         self.assertTrue(isinstance(obj_repr, bytes))
+
+        # Batch conversions
+        self.assertEqual(list(converters.to_unicode_many([5], non_string='empty')), [''])
+        self.assertEqual(list(converters.to_bytes_many([5], non_string='empty')), [b''])
+        self.assertRaises(TypeError, list, converters.to_unicode_many([5], non_string='strict'))
+        self.assertRaises(TypeError, list, converters.to_bytes_many([5], non_string='strict'))
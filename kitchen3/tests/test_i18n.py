@@ -2,10 +2,20 @@
 #
 import unittest
 
+import copy
+import gc
+import gettext
 import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import types
 
 from kitchen import i18n
+from kitchen.i18n import bundle
 
 import base_classes
 
@@ -223,6 +233,24 @@ class TestDummyTranslations(unittest.TestCase, base_classes.UnicodeTestData):
                 % (repr(message), repr(self.translations.gettext(message)),
                     repr(value), charset))
 
+    def test_reencode_if_necessary(self):
+        reencode = self.translations._reencode_if_necessary
+        self.assertEqual(reencode(self.u_spanish, 'latin-1'), self.latin1_spanish)
+        self.assertEqual(reencode(self.utf8_spanish, 'utf-8'), self.utf8_spanish)
+        self.assertEqual(reencode(self.latin1_spanish, 'utf-8'),
+                self.utf8_mangled_spanish_latin1_as_utf8)
+        self.assertEqual(reencode(5, 'utf-8'), b'')
+        # Bytes that are known to be in the output charset are not checked
+        self.assertEqual(reencode(self.latin1_spanish, 'latin-1', 'ISO8859-1'),
+                self.latin1_spanish)
+        self.assertEqual(reencode(self.latin1_spanish, 'utf-8', 'latin-1'),
+                self.utf8_mangled_spanish_latin1_as_utf8)
+
+    def test_charset_name(self):
+        for charset in ('utf-8', 'UTF8', 'utf_8', 'U8'):
+            self.assertEqual(i18n._charset_name(charset), 'utf-8')
+        self.assertEqual(i18n._charset_name('X-Unknown'), 'x-unknown')
+
     def check_lgettext(self, message, value, charset=None,
             locale='en_US.UTF-8'):
         os.environ['LC_ALL'] = locale
@@ -544,6 +572,33 @@ class TestNewGNURealTranslations_UTF8(unittest.TestCase, base_classes.UnicodeTes
         self.assertEqual(_(self.utf8_not_in_catalog, 'throwaway', 1), self.u_not_in_catalog)
         self.assertEqual(_(self.u_not_in_catalog, 'throwaway', 1), self.u_not_in_catalog)
 
+    def test_message_cache(self):
+        translations = self.translations
+        translations.enable_message_cache(maxsize=2)
+        _ = translations.ugettext
+        for message in (self.u_kitchen, self.utf8_kitchen, self.u_kitchen):
+            self.assertEqual(_(message), self.u_pt_kitchen)
+        self.assertEqual(_(self.u_kuratomi), self.u_ja_kuratomi)
+        self.assertEqual(translations.ungettext(self.u_lemon, self.u_lemons, 1),
+                self.u_limao)
+        # Unhashable messages are not cached
+        self.assertEqual(_([self.u_kitchen]), '')
+
+        self.assertEqual(translations.gettext(self.u_kitchen), self.utf8_pt_kitchen)
+        translations.set_output_charset('latin1')
+        self.assertEqual(translations.gettext(self.u_kitchen), self.latin1_pt_kitchen)
+
+        self.assertEqual(_(self.u_in_fallback), self.u_in_fallback)
+        fallback_file = os.path.join(os.path.dirname(__file__), 'data',
+                'locale-old', 'pt_BR', 'LC_MESSAGES', 'test.mo')
+        with open(fallback_file, 'rb') as mofile:
+            translations.add_fallback(i18n.NewGNUTranslations(mofile))
+        self.assertEqual(_(self.u_in_fallback), self.u_yes_in_fallback)
+
+        translations.disable_message_cache()
+        self.assertEqual(translations._message_caches, [])
+        self.assertEqual(translations.ugettext(self.u_kitchen), self.u_pt_kitchen)
+
 
 class TestNewGNURealTranslations_Latin1(TestNewGNURealTranslations_UTF8):
     def setUp(self):
@@ -789,6 +844,105 @@ class TestFallbackNewGNURealTranslations_Latin1(TestFallbackNewGNURealTranslatio
         self.assertEqual(_(self.u_not_in_catalog, 'throwaway', 1), self.latin1_not_in_catalog)
 
 
+class TestLazyGNURealTranslations_UTF8(TestNewGNURealTranslations_UTF8):
+    def setUp(self):
+        # The catalogs have already been loaded with the default class here
+        TestNewGNURealTranslations_UTF8.setUp(self)
+        self.translations = i18n.get_translation_object('test',
+                ['%s/data/locale/' % os.path.dirname(__file__)],
+                class_=i18n.LazyGNUTranslations)
+
+    def tearDown(self):
+        TestNewGNURealTranslations_UTF8.tearDown(self)
+        i18n.clear_catalog_cache()
+
+    def test_loaded_with_other_class(self):
+        '''The class is used even if the catalog was loaded with another one'''
+        localedirs = ['%s/data/locale/' % os.path.dirname(__file__)]
+        default = i18n.get_translation_object('test', localedirs,
+                languages=['pt_BR'], python2_api=False)
+        lazy = i18n.get_translation_object('test', localedirs,
+                languages=['pt_BR'], class_=i18n.LazyGNUTranslations,
+                python2_api=False)
+        self.assertEqual(type(default), i18n.NewGNUTranslations)
+        self.assertEqual(type(lazy), i18n.LazyGNUTranslations)
+        self.assertEqual(type(i18n.get_translation_object('test', localedirs,
+                languages=['pt_BR'], python2_api=False)),
+                i18n.NewGNUTranslations)
+        self.assertEqual(lazy.gettext(self.u_kitchen),
+                default.gettext(self.u_kitchen))
+
+    def test_same_catalog(self):
+        for localedir in ('locale', 'locale-old'):
+            filename = os.path.join(os.path.dirname(__file__), 'data',
+                    localedir, 'pt_BR', 'LC_MESSAGES', 'test.mo')
+            with open(filename, 'rb') as mofile:
+                new = i18n.NewGNUTranslations(mofile)
+            with open(filename, 'rb') as mofile:
+                lazy = i18n.LazyGNUTranslations(mofile)
+            self.assertEqual(lazy.info(), new.info())
+            self.assertEqual(lazy.charset(), new.charset())
+            self.assertEqual(dict(lazy._catalog), new._catalog)
+            self.assertEqual(len(lazy._catalog), len(new._catalog))
+            for n in range(5):
+                self.assertEqual(lazy.plural(n), new.plural(n))
+
+    def test_missing_keys(self):
+        catalog = self.translations._catalog
+        self.assertRaises(KeyError, catalog.__getitem__, self.u_not_in_catalog)
+        self.assertRaises(KeyError, catalog.__getitem__, self.utf8_kitchen)
+        # Messages with plural forms are only found with a plural form index
+        self.assertRaises(KeyError, catalog.__getitem__, self.u_lemon)
+        self.assertRaises(KeyError, catalog.__getitem__, (self.u_lemon, 2))
+        self.assertRaises(KeyError, catalog.__getitem__, (self.u_kitchen, 0))
+        self.assertEqual(catalog.get(self.u_not_in_catalog), None)
+
+class TestFallbackLazyGNURealTranslations_UTF8(TestFallbackNewGNURealTranslations_UTF8):
+    def setUp(self):
+        TestFallbackNewGNURealTranslations_UTF8.setUp(self)
+        i18n.clear_catalog_cache()
+        self.translations = i18n.get_translation_object('test',
+                ['%s/data/locale/' % os.path.dirname(__file__),
+                    '%s/data/locale-old' % os.path.dirname(__file__)],
+                class_=i18n.LazyGNUTranslations)
+
+    def tearDown(self):
+        TestFallbackNewGNURealTranslations_UTF8.tearDown(self)
+        i18n.clear_catalog_cache()
+
+class TestFlattenedFallbackNewGNURealTranslations_UTF8(TestFallbackNewGNURealTranslations_UTF8):
+    def setUp(self):
+        TestFallbackNewGNURealTranslations_UTF8.setUp(self)
+        self.translations = i18n.get_translation_object('test',
+                ['%s/data/locale/' % os.path.dirname(__file__),
+                    '%s/data/locale-old' % os.path.dirname(__file__)],
+                flatten=True)
+
+    def tearDown(self):
+        TestFallbackNewGNURealTranslations_UTF8.tearDown(self)
+        i18n.clear_catalog_cache()
+
+    def test_flattened(self):
+        # Both catalogs are in the first translation object
+        self.assertEqual(self.translations._fallback, None)
+        self.assertEqual(self.translations._catalog[self.u_in_fallback],
+                self.u_yes_in_fallback)
+        # The cached translation objects were not changed
+        for translation in i18n._translations.values():
+            self.assertTrue(translation._catalog is not self.translations._catalog)
+
+    def test_unmergeable(self):
+        localedirs = ['%s/data/locale/' % os.path.dirname(__file__),
+                '%s/data/locale-old' % os.path.dirname(__file__)]
+        mofiles = i18n._find_catalogs('test', localedirs, None)
+        translations = [copy.copy(i18n._translations[(mofile,
+                i18n.NewGNUTranslations)])
+                for mofile in mofiles]
+        translations[1]._info = dict(translations[1]._info)
+        translations[1]._info['plural-forms'] = 'nplurals=1; plural=0'
+        self.assertEqual(i18n._flatten_translations(mofiles, translations),
+                translations)
+
 class TestFallback(unittest.TestCase, base_classes.UnicodeTestData):
     def setUp(self):
         self.old_LC_ALL = os.environ.get('LC_ALL', None)
@@ -873,3 +1027,296 @@ class TestDefaultLocaleDir(unittest.TestCase, base_classes.UnicodeTestData):
         # Returns msgid because the string is in a fallback catalog which we
         # haven't setup
         self.assertEqual(_(self.u_in_fallback), self.utf8_in_fallback)
+
+class TestCatalogCache(unittest.TestCase, base_classes.UnicodeTestData):
+    def setUp(self):
+        self.localedir = tempfile.mkdtemp()
+        shutil.copytree('%s/data/locale/pt_BR' % os.path.dirname(__file__),
+                os.path.join(self.localedir, 'pt_BR'))
+        i18n.clear_catalog_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.localedir, ignore_errors=True)
+        i18n.clear_catalog_cache()
+
+    def test_catalog_cache(self):
+        translations = i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False)
+        self.assertEqual(translations.gettext(self.u_kitchen), self.u_pt_kitchen)
+        self.assertEqual(i18n._catalog_paths[('test',
+            (self.localedir, i18n._DEFAULT_LOCALEDIR), ('pt_BR',))],
+            (os.path.join(self.localedir, 'pt_BR', 'LC_MESSAGES', 'test.mo'),))
+
+        # The catalogs that were found are remembered
+        shutil.rmtree(self.localedir)
+        translations = i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False)
+        self.assertEqual(translations.gettext(self.u_kitchen), self.u_pt_kitchen)
+
+        # Until the cache is cleared
+        i18n.clear_catalog_cache()
+        translations = i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False)
+        self.assertTrue(isinstance(translations, i18n.DummyTranslations))
+        self.assertEqual(translations.gettext(self.u_kitchen), self.u_kitchen)
+
+    def test_environment_languages(self):
+        old_LANGUAGE = os.environ.get('LANGUAGE', None)
+        try:
+            os.environ['LANGUAGE'] = 'pt_BR'
+            translations = i18n.get_translation_object('test',
+                    [self.localedir], python2_api=False)
+            self.assertEqual(translations.gettext(self.u_kitchen),
+                    self.u_pt_kitchen)
+            # Changing the environment is a new search
+            os.environ['LANGUAGE'] = 'en_US'
+            translations = i18n.get_translation_object('test',
+                    [self.localedir], python2_api=False)
+            self.assertEqual(translations.gettext(self.u_kitchen),
+                    self.u_kitchen)
+        finally:
+            if old_LANGUAGE is None:
+                del os.environ['LANGUAGE']
+            else:
+                os.environ['LANGUAGE'] = old_LANGUAGE
+
+    def test_single_flight(self):
+        loaded = []
+        class SlowTranslations(i18n.NewGNUTranslations):
+            def _parse(self, fp):
+                loaded.append(fp.name)
+                time.sleep(0.05)
+                i18n.NewGNUTranslations._parse(self, fp)
+
+        results = []
+        def load():
+            translations = i18n.get_translation_object('test',
+                    [self.localedir], languages=['pt_BR'],
+                    class_=SlowTranslations, python2_api=False)
+            results.append(translations.gettext(self.u_kitchen))
+        threads = [threading.Thread(target=load) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [self.u_pt_kitchen] * 8)
+        self.assertEqual(len(loaded), 1)
+        self.assertEqual(i18n._loading_locks, {})
+
+    def test_shared(self):
+        translations = i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False, shared=True)
+        self.assertEqual(translations.gettext(self.u_kitchen), self.u_pt_kitchen)
+        self.assertTrue(i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False, shared=True)
+                is translations)
+        # Different parameters and unshared objects are separate objects
+        self.assertFalse(i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False, shared=True,
+                codeset='latin-1') is translations)
+        unshared = i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False)
+        self.assertFalse(unshared is translations)
+        # But they share the catalog
+        self.assertTrue(unshared._catalog is translations._catalog)
+
+        i18n.clear_catalog_cache()
+        self.assertFalse(i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False, shared=True)
+                is translations)
+
+    def test_shared_classes(self):
+        '''Shared objects are made with the class that was asked for'''
+        default = i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False, shared=True)
+        lazy = i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], class_=i18n.LazyGNUTranslations,
+                python2_api=False, shared=True)
+        self.assertEqual(type(default), i18n.NewGNUTranslations)
+        self.assertEqual(type(lazy), i18n.LazyGNUTranslations)
+        self.assertTrue(i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], class_=i18n.LazyGNUTranslations,
+                python2_api=False, shared=True) is lazy)
+        self.assertEqual(lazy.gettext(self.u_kitchen), self.u_pt_kitchen)
+
+    def test_copy(self):
+        translations = i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False)
+        copied = copy.copy(translations)
+        copied.set_output_charset('latin-1')
+        self.assertEqual(copied.lgettext(self.u_kitchen),
+                self.u_pt_kitchen.encode('latin-1'))
+        self.assertEqual(translations._output_charset, None)
+        # The gettext methods are bound to the copy
+        self.assertTrue(copied.gettext.__self__ is copied)
+
+    def test_stdlib_class(self):
+        '''Translation classes without python2_api can be used'''
+        translations = i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], class_=gettext.GNUTranslations,
+                python2_api=False)
+        self.assertTrue(isinstance(translations, gettext.GNUTranslations))
+        self.assertEqual(translations.gettext(self.u_kitchen),
+                self.u_pt_kitchen)
+
+    def test_preload_catalogs(self):
+        preloaded = i18n.preload_catalogs('test', [self.localedir],
+                languages=['pt_BR', 'fr'], freeze=False)
+        self.assertEqual(sorted(preloaded), ['fr', 'pt_BR'])
+        self.assertTrue(isinstance(preloaded['fr'], i18n.DummyTranslations))
+        self.assertEqual(preloaded['pt_BR'].gettext(self.u_kitchen),
+                self.u_pt_kitchen)
+
+        # Nothing is read from the filesystem after that
+        shutil.rmtree(self.localedir)
+        translations = i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False, shared=True)
+        self.assertTrue(translations is preloaded['pt_BR'])
+
+    def test_preload_catalogs_class(self):
+        '''Preloading uses class_ even if the catalogs were loaded before'''
+        translations = i18n.get_translation_object('test', [self.localedir],
+                languages=['pt_BR'], python2_api=False)
+        self.assertEqual(type(translations), i18n.NewGNUTranslations)
+        preloaded = i18n.preload_catalogs('test', [self.localedir],
+                languages=['pt_BR'], class_=i18n.LazyGNUTranslations,
+                freeze=False)
+        self.assertEqual(type(preloaded['pt_BR']), i18n.LazyGNUTranslations)
+        self.assertEqual(preloaded['pt_BR'].gettext(self.u_kitchen),
+                self.u_pt_kitchen)
+
+    @unittest.skipUnless(hasattr(os, 'fork') and hasattr(gc, 'freeze'),
+            'needs os.fork and gc.freeze')
+    def test_preload_catalogs_fork(self):
+        try:
+            i18n.preload_catalogs('test', [self.localedir],
+                    languages=['pt_BR'])
+            self.assertTrue(gc.get_freeze_count() > 0)
+            shutil.rmtree(self.localedir)
+            pid = os.fork()
+            if pid == 0:
+                translations = i18n.get_translation_object('test',
+                        [self.localedir], languages=['pt_BR'],
+                        python2_api=False, shared=True)
+                os._exit(translations.gettext(self.u_kitchen)
+                        != self.u_pt_kitchen)
+            self.assertEqual(os.waitpid(pid, 0)[1], 0)
+        finally:
+            gc.unfreeze()
+
+class TestPluralForms(unittest.TestCase):
+    def test_common_plurals(self):
+        numbers = list(range(0, 2500)) + [10 ** 6 + n for n in range(200)]
+        for expression, evaluate in i18n._COMMON_PLURALS.items():
+            compiled = gettext.c2py(expression)
+            self.assertEqual([evaluate(n) for n in numbers],
+                    [compiled(n) for n in numbers], expression)
+
+    def test_plural_function(self):
+        expressions = ('n%10==1 && n%100!=11 ? 0 : n%10>=2 && n%10<=4 &&'
+                    ' (n%100<10 || n%100>=20) ? 1 : 2',
+                # Not one of the common expressions
+                'n==0 ? 0 : n==1 ? 1 : n==2 ? 2 : n%100>=3 && n%100<=10 ? 3'
+                    ' : n%100>=11 ? 4 : 5')
+        numbers = list(range(-5, 2500)) + [True, False, 10 ** 20]
+        for expression in expressions:
+            plural = i18n._plural_function(expression)
+            self.assertTrue(i18n._plural_function(expression) is plural)
+            compiled = gettext.c2py(expression)
+            self.assertEqual([plural(n) for n in numbers],
+                    [compiled(n) for n in numbers])
+            self.assertRaises(TypeError, plural, '1')
+
+class TestTranslationBundle(unittest.TestCase, base_classes.UnicodeTestData):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.localedirs = ['%s/data/locale/' % os.path.dirname(__file__),
+                '%s/data/locale-old' % os.path.dirname(__file__)]
+        self.filename = os.path.join(self.tmpdir, 'test.bundle')
+        self.assertEqual(bundle.write_bundle('test', self.filename,
+            self.localedirs), 2)
+        i18n.clear_catalog_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        i18n.clear_catalog_cache()
+
+    def test_same_translations(self):
+        translations = bundle.TranslationBundle(
+                self.filename).get_translation_object(languages=['pt_BR'])
+        expected = i18n.get_translation_object('test', self.localedirs,
+                languages=['pt_BR'], python2_api=False)
+        self.assertEqual(translations.info(), expected.info())
+        for message in (self.u_kitchen, self.utf8_kitchen, self.u_kuratomi,
+                self.u_in_fallback, self.u_not_in_catalog):
+            self.assertEqual(translations.gettext(message),
+                    expected.gettext(message))
+            self.assertEqual(translations.lgettext(message),
+                    expected.lgettext(message))
+        for n in range(4):
+            self.assertEqual(
+                    translations.ngettext(self.u_lemon, self.u_lemons, n),
+                    expected.ngettext(self.u_lemon, self.u_lemons, n))
+
+    def test_languages(self):
+        translation_bundle = bundle.TranslationBundle(self.filename)
+        self.assertEqual(translation_bundle.languages(), ['pt_BR'])
+        translations = translation_bundle.get_translation_object(
+                languages=['pt_BR.utf8'], python2_api=True)
+        self.assertEqual(translations.gettext(self.u_kitchen),
+                self.utf8_pt_kitchen)
+        self.assertEqual(translations.ugettext(self.u_kitchen),
+                self.u_pt_kitchen)
+
+        translations = translation_bundle.get_translation_object(
+                languages=['de'])
+        self.assertTrue(isinstance(translations, i18n.DummyTranslations))
+        self.assertRaises(IOError, translation_bundle.get_translation_object,
+                languages=['de'], fallback=False)
+
+    def test_non_utf8_catalog(self):
+        localedir = os.path.join(self.tmpdir, 'locale')
+        os.makedirs(os.path.join(localedir, 'es', 'LC_MESSAGES'))
+        mofile = os.path.join(localedir, 'es', 'LC_MESSAGES', 'spanish.mo')
+        with open(mofile, 'wb') as catalog:
+            catalog.write(bundle._write_mo({
+                b'': b'Content-Type: text/plain; charset=ISO-8859-1\n',
+                self.latin1_spanish: self.u_spanish.upper().encode('latin-1')}))
+        bundle.write_bundle('spanish', self.filename, [localedir])
+
+        translations = bundle.TranslationBundle(
+                self.filename).get_translation_object(languages=['es'],
+                        python2_api=True)
+        with open(mofile, 'rb') as catalog:
+            expected = i18n.NewGNUTranslations(catalog)
+        self.assertEqual(translations.ugettext(self.u_spanish),
+                self.u_spanish.upper())
+        self.assertEqual(translations.gettext(self.u_spanish),
+                expected.gettext(self.u_spanish))
+        self.assertEqual(translations.charset(), expected.charset())
+
+    def test_bad_bundle(self):
+        with open(self.filename, 'wb') as bad_bundle:
+            bad_bundle.write(b'not a bundle')
+        self.assertRaises(IOError, bundle.TranslationBundle, self.filename)
+
+class TestKitchenGettext(unittest.TestCase):
+    def test_lazy_setup(self):
+        '''kitchen's own gettext functions are set up on first use'''
+        import kitchen
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.dirname(os.path.dirname(kitchen.__file__))
+        output = subprocess.check_output([sys.executable, '-c',
+            'import sys, kitchen.text.converters;'
+            ' print("kitchen.i18n" in sys.modules);'
+            ' from kitchen import _, b_;'
+            ' print("kitchen.i18n" in sys.modules, _("a"), b_("a"))'], env=env)
+        self.assertEqual(output.split(), [b'False', b'True', b'a', b"b'a'"])
+
+    def test_gettext_functions(self):
+        import kitchen
+        for name in ('_', 'N_', 'b_', 'bN_'):
+            self.assertTrue(callable(getattr(kitchen, name)))
+        self.assertEqual(kitchen._('kitchen sink'), 'kitchen sink')
+        self.assertEqual(kitchen.bN_('one', 'many', 2), b'many')
+        self.assertRaises(AttributeError, getattr, kitchen, 'nonexistent')
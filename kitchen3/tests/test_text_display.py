@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 #
+import io
 import unittest
 
 from kitchen.text.exceptions import ControlCharError
@@ -77,12 +78,46 @@ class TestDisplay(base_classes.UnicodeTestData, unittest.TestCase):
             else:
                 self.assertEqual(display._ucp_width(codepoint), 1)
 
+    def test_internal_width_table(self):
+        '''Test that the width table covers all of unicode and agrees with the interval tables'''
+        self.assertEqual(len(display._WIDTH_TABLE) << display._WIDTH_PAGE_BITS, 0x110000)
+        for start, end in display._COMBINING:
+            for codepoint in (start, end):
+                if codepoint >= 0xa0:
+                    self.assertEqual(display._ucp_width(codepoint), 0)
+        for start, end in display._EASTASIAN_WIDE:
+            for codepoint in (start, end):
+                if not display._interval_bisearch(codepoint, display._COMBINING):
+                    self.assertEqual(display._ucp_width(codepoint), 2)
+        # Last plane and past the end of unicode
+        self.assertEqual(display._ucp_width(0x10fffd), 1)
+        self.assertEqual(display._ucp_width(0x110000), 1)
+        self.assertEqual(display._ucp_width(0x110000, 'strict'), 1)
+
     def test_textual_width(self):
         '''Test that we find the proper number of spaces that a utf8 string will consume'''
         self.assertEqual(display.textual_width(self.u_japanese), 31)
         self.assertEqual(display.textual_width(self.u_spanish), 50)
         self.assertEqual(display.textual_width(self.u_mixed), 23)
 
+    def test_textual_width_fast_paths(self):
+        '''Test that textual_width agrees with _ucp_width for every kind of string'''
+        def ucp_width_sum(msg, control_chars='guess'):
+            return sum(display._ucp_width(ord(c), control_chars) for c in msg)
+        all_ascii = ''.join(chr(c) for c in range(0, 0x80))
+        all_latin1 = ''.join(chr(c) for c in range(0, 0x100))
+        for msg in (self.u_empty_string, self.u_ascii, self.u_spanish,
+                self.u_japanese, self.u_mixed, self.u_paragraph,
+                self.u_mixed_para, all_ascii, all_latin1,
+                'tab\tnew\nline\x08\x1b\x7f', 'e\u0301\u0300\u02ff\u0300',
+                '\x94\x85' + self.u_japanese, '\U00020000\U000e0100\U0010fffd'):
+            self.assertEqual(display.textual_width(msg), ucp_width_sum(msg))
+
+        self.assertEqual(display.textual_width(self.u_spanish, 'strict'), 50)
+        self.assertEqual(display.textual_width(self.u_japanese, 'strict'), 31)
+        self.assertRaises(ControlCharError, display.textual_width, 'a\nb', 'strict')
+        self.assertRaises(ControlCharError, display.textual_width, 'く\x85', 'strict')
+
     def test_textual_width_chop(self):
         '''utf8_width_chop with byte strings'''
         self.assertEqual(display.textual_width_chop(self.u_mixed, 1000), self.u_mixed)
@@ -111,6 +146,38 @@ class TestDisplay(base_classes.UnicodeTestData, unittest.TestCase):
         self.assertEqual(display.textual_width_chop(self.u_mixed, 20), self.u_mixed[:16])
         self.assertEqual(display.textual_width_chop(self.u_mixed, 21), self.u_mixed[:17])
 
+    def test_textual_width_chop_zero_width(self):
+        '''Chopping keeps zero width characters that still fit'''
+        self.assertEqual(display.textual_width_chop('ab\u0301c', 2), 'ab\u0301')
+        self.assertEqual(display.textual_width_chop('\u0301abc', 0), '\u0301')
+        self.assertEqual(display.textual_width_chop('ab\x08cd', 2), 'ab\x08c')
+        self.assertEqual(display.textual_width_chop('a\nb', 1), 'a\n')
+        self.assertEqual(display.textual_width_chop(self.utf8_mixed, 3), self.u_mixed[:2])
+        self.assertEqual(display.textual_width_chop(self.u_ascii, 9), self.u_ascii[:9])
+        self.assertEqual(display.textual_width_chop(self.u_spanish, 17), self.u_spanish[:17])
+
+    def test_textual_width_chop_negative(self):
+        '''Nothing fits in a negative width'''
+        self.assertEqual(display.textual_width_chop('abcdef', -1), '')
+        self.assertEqual(display.textual_width_chop(self.u_mixed, -100), '')
+        self.assertEqual(display.textual_width_chop('\u0301abc', -1), '')
+        display.enable_width_cache()
+        try:
+            self.assertEqual(display.textual_width_chop('abcdef', -1), '')
+        finally:
+            display.disable_width_cache()
+
+    def test_internal_textual_width_chop_point(self):
+        '''Test that the chop point comes with the width of the chopped string'''
+        for msg in (self.u_ascii, self.u_spanish, self.u_japanese, self.u_mixed):
+            for chop in range(0, display.textual_width(msg) + 2):
+                eos, width = display._textual_width_chop_point(msg, chop)
+                self.assertEqual(width, display.textual_width(msg[:eos]))
+                self.assertTrue(width <= chop)
+                if eos < len(msg):
+                    self.assertTrue(display.textual_width(msg[:eos + 1]) > chop)
+        self.assertEqual(display._textual_width_chop_point(self.u_mixed, -1), (0, 0))
+
     def test_textual_width_fill(self):
         '''Pad a utf8 string'''
         self.assertEqual(display.textual_width_fill(self.u_mixed, 1), self.u_mixed)
@@ -121,6 +188,61 @@ class TestDisplay(base_classes.UnicodeTestData, unittest.TestCase):
         self.assertEqual(display.textual_width_fill(self.u_mixed, 25, chop=18), self.u_mixed[:-4] + '       ')
         self.assertEqual(display.textual_width_fill(self.u_mixed, 25, chop=18, prefix=self.u_spanish, suffix=self.u_spanish), self.u_spanish + self.u_mixed[:-4] + self.u_spanish + '       ')
 
+    def test_width_cache(self):
+        '''Test that caching widths does not change the results'''
+        self.assertEqual(display.width_cache_info(), None)
+        display.enable_width_cache(maxsize=8)
+        try:
+            for dummy in range(2):
+                self.assertEqual(display.textual_width(self.u_mixed), 23)
+                self.assertEqual(display.textual_width(self.utf8_mixed), 23)
+                self.assertEqual(display.textual_width_chop(self.u_mixed, 19), self.u_mixed[:-4])
+                self.assertEqual(display.textual_width_fill(self.u_mixed, 25, chop=18), self.u_mixed[:-4] + '       ')
+                self.assertRaises(ControlCharError, display.textual_width, 'a\nb', 'strict')
+                self.assertEqual(display.textual_width('a\nb'), 2)
+            info = display.width_cache_info()
+            self.assertEqual(info.maxsize, 8)
+            self.assertEqual(info.currsize, 5)
+            self.assertTrue(info.hits >= 5)
+
+            display.clear_width_cache()
+            info = display.width_cache_info()
+            self.assertEqual((info.hits, info.misses, info.currsize), (0, 0, 0))
+        finally:
+            display.disable_width_cache()
+        self.assertEqual(display.width_cache_info(), None)
+        # Safe to call when the cache is disabled
+        display.clear_width_cache()
+        display.disable_width_cache()
+
+    def test_textual_width_columns(self):
+        '''Test that columns line up the same as filling each cell'''
+        rows = ((self.u_mixed, self.utf8_spanish, 'x'),
+                (self.u_japanese, 'ascii'),
+                ('', self.u_mixed, 10))
+        cells = [[self.u_mixed, self.u_spanish, 'x'],
+                [self.u_japanese, 'ascii', ''],
+                ['', self.u_mixed, '10']]
+        widths = [31, 50, 2]
+        self.assertEqual(display.textual_width_columns(rows),
+                [' '.join(display.textual_width_fill(cell, width)
+                    for cell, width in zip(row, widths)) for row in cells])
+
+        widths = [20, 18, 2]
+        lefts = [False, True, False]
+        chops = [None, 18, None]
+        self.assertEqual(display.textual_width_columns(rows, widths=(20,),
+            chop=(None, 18), left=lefts, separator=' | '),
+            [' | '.join(display.textual_width_fill(cell, width, chop=chop, left=left)
+                for cell, width, chop, left in zip(row, widths, chops, lefts))
+                for row in cells])
+
+        self.assertEqual(display.textual_width_columns(rows, chop=5),
+                ['く ku' + ' El ve' + ' x ',
+                 '速い ' + ' ascii' + '   ',
+                 '     ' + ' く ku' + ' 10'])
+        self.assertEqual(display.textual_width_columns(()), [])
+
     def test_internal_textual_width_le(self):
         test_data = ''.join([self.u_mixed, self.u_spanish])
         tw = display.textual_width(test_data)
@@ -140,6 +262,34 @@ class TestDisplay(base_classes.UnicodeTestData, unittest.TestCase):
         self.assertEqual(display.wrap(self.u_mixed_para, width=57,
             initial_indent='    ', subsequent_indent='----'),
             self.u_mixed_para_57_initial_subsequent_out)
+        # Combining characters that can't be composed take no columns
+        self.assertEqual(display.wrap('a e b\u0300', 5), ['a e b\u0300'])
+        self.assertEqual(display.wrap('a e b\u0300 c', 5),
+                ['a e b\u0300', 'c'])
+        # So do control characters
+        self.assertEqual(display.wrap('ab\x07\x07\x07 cd', 5),
+                ['ab\x07\x07\x07 cd'])
+        self.assertEqual(display.wrap('ab\x07 cd ef', 5),
+                ['ab\x07 cd', 'ef'])
+
+    def test_wrap_lists(self):
+        '''Test that wrapping keeps list and block indentation'''
+        text = '''Some changes:
+- first item in the list that goes on for quite a while
+  and continues here
+- second く ra item
+
+    block indented text that is long enough to wrap
+'''
+        self.assertEqual(display.wrap(text, 30, subsequent_indent='  '),
+                ['Some changes:',
+                 '  - first item in the list',
+                 '    that goes on for quite a',
+                 '    while and continues here',
+                 '  - second く ra item',
+                 '  ',
+                 '      block indented text that',
+                 '      is long enough to wrap'])
 
     def test_fill(self):
         self.assertEqual(display.fill(self.u_paragraph), '\n'.join(self.u_paragraph_out))
@@ -149,6 +299,31 @@ class TestDisplay(base_classes.UnicodeTestData, unittest.TestCase):
             initial_indent='    ', subsequent_indent='----'),
             '\n'.join(self.u_mixed_para_57_initial_subsequent_out))
 
+    def test_iter_wrap(self):
+        '''Test that wrapping a stream of lines works like wrapping the whole text'''
+        for text in (self.u_paragraph, self.u_mixed_para, self.u_mixed,
+                self.u_empty_string, '\n\n', '\nfirst\n\n\nsecond\n\n\n'):
+            expected = display.wrap(text, width=30, subsequent_indent='  ')
+            self.assertEqual(list(display.iter_wrap(io.StringIO(text),
+                width=30, subsequent_indent='  ')), expected)
+            self.assertEqual(list(display.iter_wrap(text.split('\n'),
+                width=30, subsequent_indent='  ')), expected)
+            self.assertEqual(list(display.iter_wrap(
+                io.BytesIO(text.encode('utf-8')), width=30,
+                subsequent_indent='  ')), expected)
+        self.assertEqual(list(display.iter_wrap([self.utf8_paragraph])),
+                self.u_paragraph_out)
+        self.assertEqual(list(display.iter_wrap(
+            io.StringIO(self.u_mixed_para), width=57, initial_indent='    ',
+            subsequent_indent='----')), self.u_mixed_para_57_initial_subsequent_out)
+
+    def test_iter_fill(self):
+        self.assertEqual(''.join(display.iter_fill(io.StringIO(self.u_paragraph))),
+                '\n'.join(self.u_paragraph_out) + '\n')
+        self.assertEqual(''.join(display.iter_fill(io.StringIO(self.u_mixed_para),
+            width=57, initial_indent='    ', subsequent_indent='----')),
+            '\n'.join(self.u_mixed_para_57_initial_subsequent_out) + '\n')
+
     def test_byte_string_textual_width_fill(self):
         self.assertEqual(display.byte_string_textual_width_fill(self.utf8_mixed, 1), self.utf8_mixed)
         self.assertEqual(display.byte_string_textual_width_fill(self.utf8_mixed, 25), self.utf8_mixed + b'  ')
@@ -50,6 +50,55 @@ class TestTextMisc(unittest.TestCase, base_classes.UnicodeTestData):
                 misc.guess_encoding(self.euc_jp_japanese)) ==
                 self.u_mangled_euc_jp_as_latin1)
 
+    def test_internal_guess_encodings(self):
+        byte_strings = [self.latin1_spanish, self.euc_jp_japanese,
+                self.latin1_spanish]
+        self.assertEqual(misc._guess_encodings(byte_strings),
+                [misc.guess_encoding(byte_string)
+                    for byte_string in byte_strings])
+        self.assertEqual(misc._guess_encodings([]), [])
+
+    def test_internal_guess_encodings_chardet(self):
+        '''Test the reused detector against chardet.detect with a fake chardet'''
+        results = {self.euc_jp_japanese: ('EUC-JP', 0.99),
+                self.latin1_spanish: ('ISO-8859-1', 0.73),
+                b'\xff\xfe\xfd': ('windows-1252', 0.2)}
+        def detect(byte_string):
+            encoding, confidence = results.get(byte_string, (None, 0.0))
+            return {'encoding': encoding, 'confidence': confidence}
+
+        class UniversalDetector(object):
+            def __init__(self):
+                self.reset()
+            def reset(self):
+                self.data = b''
+                self.result = {'encoding': None, 'confidence': 0.0}
+            def feed(self, byte_string):
+                self.data += byte_string
+            def close(self):
+                self.result = detect(self.data)
+
+        class FakeChardet(object):
+            pass
+        fake_chardet = FakeChardet()
+        fake_chardet.detect = detect
+        fake_chardet.universaldetector = FakeChardet()
+        fake_chardet.universaldetector.UniversalDetector = UniversalDetector
+
+        old_chardet = misc.chardet
+        misc.chardet = fake_chardet
+        try:
+            byte_strings = [self.latin1_spanish, self.euc_jp_japanese,
+                    b'\xff\xfe\xfd', self.latin1_spanish, b'\xff']
+            self.assertEqual(misc._guess_encodings(byte_strings),
+                    ['ISO-8859-1', 'EUC-JP', 'latin-1', 'ISO-8859-1',
+                        'latin-1'])
+            self.assertEqual(misc._guess_encodings(byte_strings),
+                    [misc.guess_encoding(byte_string)
+                        for byte_string in byte_strings])
+        finally:
+            misc.chardet = old_chardet
+
     def test_str_eq(self):
         # str vs str:
         self.assertTrue(misc.str_eq(self.euc_jp_japanese, self.euc_jp_japanese) == True)
@@ -112,6 +161,20 @@ class TestTextMisc(unittest.TestCase, base_classes.UnicodeTestData):
         self.assertTrue(misc.html_entities_unescape('a&#1234567890;b') == 'a&#1234567890;b')
         self.assertTrue(misc.html_entities_unescape('a&#xfffd;b') == 'a\ufffdb')
         self.assertTrue(misc.html_entities_unescape('a&#65533;b') == 'a\ufffdb')
+        self.assertTrue(misc.html_entities_unescape('a&nbsp;&unknown;&amp;lt;'
+            ' &#xfffd;b') == 'a\xa0&unknown;&lt; \ufffdb')
+        # Same results the second time a reference or tag is seen
+        for i in range(2):
+            self.assertTrue(misc.html_entities_unescape('&#x263a;<p>') == '\u263a')
+            self.assertTrue(misc.html_entities_unescape('&#%s65;<%s>'
+                % ('0' * 100, 'p' * 10000)) == 'A')
+            self.assertTrue(misc.html_entities_unescape('&%s;'
+                % ('x' * 10000)) == '&%s;' % ('x' * 10000))
+        self.assertTrue(misc.html_entities_unescape(''.join('<p%d>&#%d;'
+            % (i, i) for i in range(32, 10032))) == ''.join(chr(i) for i
+                in range(32, 10032)))
+        string = 'No entities'
+        self.assertTrue(misc.html_entities_unescape(string) is string)
 
     def test_byte_string_valid_xml(self):
         self.assertTrue(misc.byte_string_valid_xml('unicode string') == False)
@@ -134,6 +197,47 @@ class TestTextMisc(unittest.TestCase, base_classes.UnicodeTestData):
         self.assertTrue(misc.byte_string_valid_encoding(b'\xff') == False)
         self.assertTrue(misc.byte_string_valid_encoding(self.euc_jp_japanese) == False)
 
+    def test_invalid_byte_strings(self):
+        byte_strings = [b'ascii', b'tab\tnewline\n', self.utf8_japanese,
+                self.euc_jp_japanese, self.utf8_ascii_chars, b'\xff',
+                'unicode string', b'c1 \xc2\x85 code', b'c1 \x85 code',
+                b'backspace \x08', b'', self.latin1_spanish]
+        for encoding in ('utf-8', 'UTF8', 'latin-1', 'ascii', 'euc_jp',
+                'utf-16'):
+            self.assertEqual(misc.invalid_xml_byte_strings(byte_strings,
+                encoding), [index for index, byte_string
+                    in enumerate(byte_strings)
+                    if not self._valid_xml(byte_string, encoding)], encoding)
+            byte_strings_only = [byte_string for byte_string in byte_strings
+                    if isinstance(byte_string, bytes)]
+            self.assertEqual(misc.invalid_encoding_byte_strings(
+                byte_strings_only, encoding), [index for index, byte_string
+                    in enumerate(byte_strings_only)
+                    if not self._valid_encoding(byte_string, encoding)],
+                encoding)
+
+        self.assertEqual(misc.invalid_xml_byte_strings(iter(byte_strings)),
+                [3, 4, 5, 6, 7, 8, 11])
+        self.assertEqual(misc.invalid_encoding_byte_strings(iter([b'a'])), [])
+        self.assertRaises(LookupError, misc.invalid_xml_byte_strings, [b'a'],
+                'unknown encoding')
+
+    def _valid_encoding(self, byte_string, encoding):
+        '''Same check as byte_string_valid_encoding without fast paths'''
+        try:
+            str(byte_string, encoding)
+        except UnicodeError:
+            return False
+        return True
+
+    def _valid_xml(self, byte_string, encoding):
+        '''Same check as byte_string_valid_xml without fast paths'''
+        if not isinstance(byte_string, bytes) or \
+                not self._valid_encoding(byte_string, encoding):
+            return False
+        return frozenset(str(byte_string, encoding)).isdisjoint(
+                misc._CONTROL_CHARS)
+
 class TestIsStringTypes(unittest.TestCase):
     def test_isbasestring(self):
         self.assertTrue(misc.isbasestring(b'abc'))